@@ -0,0 +1,84 @@
+import os
+import polars as pl
+from processing.CitationDataset import scan_citations
+
+INVALID_DATES = "Invalid dates"
+COLUMNS = ["oci", "citing_doi", "cited_doi", "citing_date", "author_info", "cited_issn", "cited_venue", "time_span"]
+
+class AggregateCubes:
+    # Legge una sola volta l'output di FilterJoinDeltaDir e salva piccole tabelle
+    # aggregate (istogrammi dei time span, date non valide, distribuzione del numero
+    # di review) da usare nel notebook e nei report al posto dei CSV completi.
+    def __init__(self, csv_file_path):
+        self.csv_file_path = csv_file_path
+
+    def scan(self):
+        time_span = pl.col("time_span")
+        sign = pl.when(time_span.str.starts_with("-")).then(-1).otherwise(1)
+        years = time_span.str.extract(r"(\d+)Y", 1).cast(pl.Int32).fill_null(0)
+        months = time_span.str.extract(r"(\d+)M", 1).cast(pl.Int32).fill_null(0)
+        valid = time_span.str.contains(r"^-?P")
+
+        df = scan_citations(self.csv_file_path).select(COLUMNS)
+        return df.with_columns(
+            pl.col("citing_date").str.slice(0, 4).alias("citing_year"),
+            valid.fill_null(False).alias("valid_span"),
+            # il segno viene dalla stringa: -P3D ha span_months 0 ma resta negativo
+            (valid & time_span.str.starts_with("-")).fill_null(False).alias("negative_span"),
+            pl.when(valid).then(sign * (years * 12 + months)).alias("span_months"),
+            pl.when(valid).then(sign * years).alias("span_years"),
+        )
+
+    def build(self):
+        # le colonne utili vengono lette una volta sola e tutte le tabelle partono da qui
+        df = self.scan().collect().lazy()
+        valid_df = df.filter(pl.col("valid_span"))
+
+        reviewers = (
+            valid_df.select("author_info", "span_years")
+            .with_columns(pl.col("author_info").str.split("; "))
+            .explode("author_info")
+            .filter(pl.col("author_info").is_not_null() & (pl.col("author_info") != ""))
+            .with_columns(
+                pl.col("author_info").str.replace(r" \(ORCID: .*\)$", "").alias("reviewer_name"),
+                pl.col("author_info").str.extract(r"\(ORCID: ([^)]*)\)", 1).alias("reviewer_orcid"),
+            )
+        )
+        issns = (
+            valid_df.select("cited_issn", "span_years")
+            .with_columns(pl.col("cited_issn").str.split(","))
+            .explode("cited_issn")
+            .with_columns(pl.col("cited_issn").str.strip_chars().alias("issn"))
+            .filter(pl.col("issn").is_not_null() & (pl.col("issn") != ""))
+        )
+        reviews_per_article = df.group_by("cited_doi").agg(pl.col("oci").n_unique().alias("reviews"))
+
+        queries = {
+            "summary": df.select(
+                pl.col("oci").n_unique().alias("citations"),
+                pl.col("citing_doi").n_unique().alias("peer_reviews"),
+                pl.col("cited_doi").n_unique().alias("reviewed_entities"),
+                (pl.col("valid_span") & ~pl.col("negative_span")).sum().alias("positive_time_spans"),
+                pl.col("negative_span").sum().alias("negative_time_spans"),
+                (pl.col("time_span") == INVALID_DATES).sum().alias("invalid_dates"),
+            ),
+            "timespan_by_citing_year": valid_df.group_by("citing_year", "span_months").agg(pl.len().alias("count")).sort("citing_year", "span_months"),
+            "timespan_by_venue": valid_df.group_by("cited_venue", "span_years").agg(pl.len().alias("count")).sort("cited_venue", "span_years"),
+            "timespan_by_issn": issns.group_by("issn", "span_years").agg(pl.len().alias("count")).sort("issn", "span_years"),
+            "timespan_by_reviewer": reviewers.group_by("reviewer_name", "reviewer_orcid", "span_years").agg(pl.len().alias("count")).sort("reviewer_name", "span_years"),
+            "invalid_dates_by_citing_year": df.group_by("citing_year").agg(
+                (pl.col("time_span") == INVALID_DATES).sum().alias("invalid_dates"),
+                pl.col("negative_span").sum().alias("negative_time_spans"),
+                pl.len().alias("citations"),
+            ).sort("citing_year"),
+            "review_count_distribution": reviews_per_article.group_by("reviews").agg(pl.len().alias("reviewed_entities")).sort("reviews"),
+        }
+        results = pl.collect_all(list(queries.values()))
+        return dict(zip(queries.keys(), results))
+
+    def save(self, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        for name, table in self.build().items():
+            output_path = os.path.join(output_dir, f"{name}.csv")
+            table.write_csv(output_path)
+            print(f"{name}: {table.height} rows saved to {output_path}")
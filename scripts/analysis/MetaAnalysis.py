@@ -3,10 +3,14 @@ import zipfile
 import argparse
 from tqdm import tqdm
 import os
+import polars as pl
+from processing.CitationDataset import scan_citations
+from extraction.DoiKeys import KEY_COLUMNS, doi_key_column, doi_key_expr, doi_keys, normalize_doi_expr
 
 class MetaAnalysis:
-    def __init__(self, combined_csv_path):
+    def __init__(self, combined_csv_path, citing_years=None):
         self.combined_csv_path = combined_csv_path
+        self.citing_years = citing_years
 
     def extract_doi_from_meta(self, zip_file_path, output_file_path):
         with open(output_file_path, 'w', encoding='utf-8') as out_file:
@@ -36,22 +40,63 @@ class MetaAnalysis:
     def count_rows(self, file_path):
         return sum(1 for line in open(file_path, 'r', encoding='utf-8')) - 1
 
+    def load_keys(self):
+        # chiavi intere a 64 bit dei DOI del CSV combinato (calcolate qui solo per i CSV più vecchi)
+        combined_df = scan_citations(self.combined_csv_path, self.citing_years)
+        names = combined_df.collect_schema().names()
+        combined_df = combined_df.select(doi_key_column(names, 'citing_doi'), doi_key_column(names, 'cited_doi')).collect()
+        return combined_df['citing_key'].drop_nulls().unique(), combined_df['cited_key'].drop_nulls().unique()
+
+    def iter_meta_batches(self, meta_file_path, batch_size):
+        reader = pl.read_csv_batched(meta_file_path, infer_schema_length=0, batch_size=batch_size)
+        while True:
+            batches = reader.next_batches(1)
+            if not batches:
+                return
+            yield batches[0].to_series(0).drop_nulls()
+
     def create_peer_review_and_article_lists(self, meta_file_path):
-        combined_df = pd.read_csv(self.combined_csv_path)
-        doi_peer_set = set(combined_df['citing_doi'])
-        doi_article_set = set(combined_df['cited_doi'])
+        peer_keys, article_keys = self.load_keys()
 
-        chunk_size = 10000
+        chunk_size = 100000
         with open('meta_peer.csv', 'w', encoding='utf-8') as peer_file, open('meta_article.csv', 'w', encoding='utf-8') as article_file:
             peer_file.write('DOI\n')
             article_file.write('DOI\n')
 
-            for chunk in tqdm(pd.read_csv(meta_file_path, chunksize=chunk_size), desc="Processing DOIs"):
-                meta_peer_list = chunk.iloc[:, 0][chunk.iloc[:, 0].isin(doi_peer_set)]
-                meta_article_list = chunk.iloc[:, 0][chunk.iloc[:, 0].isin(doi_article_set)]
+            for dois in tqdm(self.iter_meta_batches(meta_file_path, chunk_size), desc="Processing DOIs"):
+                keys = doi_keys(dois)
+                meta_peer_list = dois.filter(keys.is_in(peer_keys))
+                meta_article_list = dois.filter(keys.is_in(article_keys))
+
+                meta_peer_list.to_frame().write_csv(peer_file, include_header=False)
+                meta_article_list.to_frame().write_csv(article_file, include_header=False)
+
+        self.verify_matches('meta_peer.csv', 'citing_doi')
+        self.verify_matches('meta_article.csv', 'cited_doi')
 
-                meta_peer_list.to_csv(peer_file, mode='a', index=False, header=False)
-                meta_article_list.to_csv(article_file, mode='a', index=False, header=False)
+    def verify_matches(self, matches_path, column):
+        # le chiavi possono collidere: i pochi DOI trovati si confermano confrontando le stringhe
+        key = KEY_COLUMNS[column]
+        matches = pl.read_csv(matches_path, infer_schema_length=0)
+        if matches.height == 0:
+            return
+        matches = matches.with_columns(
+            normalize_doi_expr('DOI').alias('doi'),
+            doi_key_expr('DOI').alias(key)
+        )
+        combined_df = scan_citations(self.combined_csv_path, self.citing_years)
+        names = combined_df.collect_schema().names()
+        candidates = (
+            combined_df.select(doi_key_column(names, column), pl.col(column))
+            .filter(pl.col(key).is_in(matches[key].unique()))
+            .select(key, normalize_doi_expr(column).alias('doi'))
+            .unique()
+            .collect()
+        )
+        verified = matches.join(candidates, on=[key, 'doi'], how='semi')
+        if verified.height < matches.height:
+            print(f"{matches.height - verified.height} key collisions discarded from {matches_path}")
+        verified.select('DOI').write_csv(matches_path)
 
     def drop_duplicates_and_save(self, input_file, output_file):
         df = pd.read_csv(input_file)
@@ -0,0 +1,153 @@
+import os
+import heapq
+import polars as pl
+from processing.CitationDataset import is_dataset, partition_files
+
+DIMENSIONS = ('cited_doi', 'reviewer', 'venue')
+COLUMNS = ['cited_doi', 'author_info', 'cited_venue']
+
+class SpaceSaving:
+    # Heavy hitter con memoria limitata (Space-Saving, Metwally et al.): al massimo
+    # capacity contatori; quando è pieno il contatore minimo viene ceduto alla nuova chiave,
+    # che eredita il suo valore come errore. count - error <= conteggio reale <= count.
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counters = {}
+        self.heap = []
+
+    def add(self, key, count=1):
+        if key in self.counters:
+            self.counters[key][0] += count
+        elif len(self.counters) < self.capacity:
+            self.counters[key] = [count, 0]
+        else:
+            min_key, min_count = self.pop_min()
+            del self.counters[min_key]
+            self.counters[key] = [min_count + count, min_count]
+        heapq.heappush(self.heap, (self.counters[key][0], key))
+        if len(self.heap) > 4 * self.capacity:
+            self.heap = [(counter[0], counter_key) for counter_key, counter in self.counters.items()]
+            heapq.heapify(self.heap)
+
+    def pop_min(self):
+        # nell'heap restano voci vecchie: si scartano finché non combaciano col contatore
+        while True:
+            count, key = heapq.heappop(self.heap)
+            counter = self.counters.get(key)
+            if counter is not None and counter[0] == count:
+                return key, count
+
+    def min_count(self):
+        # limite superiore del conteggio reale di qualsiasi chiave non monitorata
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(counter[0] for counter in self.counters.values())
+
+    def top(self, k):
+        ranked = sorted(self.counters.items(), key=lambda item: (-item[1][0], item[0]))
+        # una chiave è sicuramente nel top-k se il suo minimo garantito supera la stima della (k+1)-esima
+        threshold = ranked[k][1][0] if len(ranked) > k else 0
+        return [
+            (key, count, error, error == 0, count - error >= threshold)
+            for key, (count, error) in ranked[:k]
+        ]
+
+class ReviewCounter:
+    # Una sola passata in streaming sull'output di FilterJoinDeltaDir (CSV o dataset
+    # Parquet): ogni batch è aggregato con polars e i conteggi parziali alimentano un
+    # SpaceSaving per dimensione, quindi la memoria dipende da capacity e batch_size.
+    # Si conta una volta ogni riga: le OCI ripetute nell'input non vengono deduplicate.
+    def __init__(self, input_path, k=10, capacity=1000, batch_size=100000):
+        self.input_path = input_path
+        self.k = k
+        self.capacity = max(capacity, k + 1)
+        self.batch_size = batch_size
+
+    def iter_batches(self):
+        if is_dataset(self.input_path):
+            files = partition_files(self.input_path) if os.path.isdir(self.input_path) else [self.input_path]
+            for file_path in files:
+                yield pl.read_parquet(file_path, columns=COLUMNS, hive_partitioning=False)
+            return
+        reader = pl.read_csv_batched(self.input_path, columns=COLUMNS, infer_schema_length=0, batch_size=self.batch_size)
+        while True:
+            batches = reader.next_batches(1)
+            if not batches:
+                return
+            yield from batches
+
+    @staticmethod
+    def batch_counts(batch):
+        cited = batch.filter(pl.col("cited_doi").is_not_null()).group_by(
+            pl.col("cited_doi").str.strip_chars().str.to_lowercase().alias("key")
+        ).len()
+        # un revisore è identificato dall'ORCID quando c'è, altrimenti dal nome
+        reviewers = (
+            batch.select(pl.col("author_info").str.split("; ").alias("author"))
+            .explode("author")
+            .filter(pl.col("author").is_not_null() & (pl.col("author") != ""))
+            .group_by(
+                pl.coalesce(
+                    pl.col("author").str.extract(r"\(ORCID: ([^)]*)\)", 1),
+                    pl.col("author").str.replace(r" \(ORCID: .*\)$", "")
+                ).alias("key")
+            ).len()
+        )
+        venues = batch.filter(pl.col("cited_venue").is_not_null() & (pl.col("cited_venue") != "")).group_by(
+            pl.col("cited_venue").alias("key")
+        ).len()
+        return dict(zip(DIMENSIONS, (cited, reviewers, venues)))
+
+    def count(self):
+        sketches = {dimension: SpaceSaving(self.capacity) for dimension in DIMENSIONS}
+        rows = 0
+        for batch in self.iter_batches():
+            rows += batch.height
+            for dimension, counts in self.batch_counts(batch).items():
+                sketch = sketches[dimension]
+                for key, count in counts.iter_rows():
+                    sketch.add(key, count)
+        print(f"{rows} citations read")
+        return sketches
+
+    def exact_counts(self, candidates):
+        # seconda passata: conteggi esatti solo per le chiavi candidate
+        exact = {dimension: dict.fromkeys(keys, 0) for dimension, keys in candidates.items()}
+        for batch in self.iter_batches():
+            for dimension, counts in self.batch_counts(batch).items():
+                counts = counts.filter(pl.col("key").is_in(list(candidates[dimension])))
+                for key, count in counts.iter_rows():
+                    exact[dimension][key] += count
+        return exact
+
+    def top(self, exact=False):
+        sketches = self.count()
+        results = {}
+        for dimension, sketch in sketches.items():
+            results[dimension] = pl.DataFrame(
+                sketch.top(self.k),
+                schema=["key", "count", "error", "exact", "guaranteed"],
+                orient="row"
+            )
+        if exact:
+            candidates = {dimension: set(sketch.counters) for dimension, sketch in sketches.items()}
+            exact_counts = self.exact_counts(candidates)
+            for dimension, counts in exact_counts.items():
+                # nessuna chiave esclusa dallo sketch può superare il suo contatore minimo
+                min_count = sketches[dimension].min_count()
+                ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:self.k]
+                results[dimension] = pl.DataFrame(
+                    [(key, count, 0, True, count >= min_count) for key, count in ranked],
+                    schema=["key", "count", "error", "exact", "guaranteed"],
+                    orient="row"
+                )
+        return results
+
+    def save(self, output_dir, exact=False):
+        os.makedirs(output_dir, exist_ok=True)
+        for dimension, table in self.top(exact).items():
+            output_path = os.path.join(output_dir, f"top_{dimension}.csv")
+            table.with_row_index("rank", offset=1).write_csv(output_path)
+            print(f"Top {self.k} by {dimension}:")
+            print(table)
+            print(f"Saved to {output_path}")
@@ -1,10 +1,12 @@
 import pandas as pd
 import argparse
 import os
+from processing.CitationDataset import is_dataset, scan_citations
 
 class VenueCounter:
-    def __init__(self, csv_file_path):
+    def __init__(self, csv_file_path, citing_years=None):
         self.csv_file_path = csv_file_path
+        self.citing_years = citing_years
 
     def count_venues(self):
         dtypes = {
@@ -12,7 +14,12 @@ class VenueCounter:
             'cited_venue': 'str'
         }
 
-        df = pd.read_csv(self.csv_file_path, dtype=dtypes, usecols=['cited_issn', 'cited_venue'])
+        if is_dataset(self.csv_file_path) or self.citing_years:
+            # dataset Parquet: si leggono solo le due colonne e le partizioni degli anni richiesti
+            venues = scan_citations(self.csv_file_path, self.citing_years).select('cited_issn', 'cited_venue').fill_null('').collect()
+            df = pd.DataFrame(venues.to_dict(as_series=False)).astype(dtypes)
+        else:
+            df = pd.read_csv(self.csv_file_path, dtype=dtypes, usecols=['cited_issn', 'cited_venue'])
         df = df.fillna('')
 
         comma_rows = df[df['cited_issn'].str.contains(',')]
@@ -0,0 +1,179 @@
+import json
+from typing import Optional, Union
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Schema di proiezione: gli unici campi di un item Crossref letti dai writer
+# (DOI, URL, type, created.date-time, indexed.date-time, ISSN, container-title,
+# author e relation.is-review-of). Tutto il resto (reference, funder, license,
+# abstract, ...) non viene materializzato.
+
+DECODERS = ('auto', 'json', 'msgspec')
+
+class DecodeError(ValueError):
+    pass
+
+# Backend json: decodifica completa, poi proiezione sugli stessi tipi del backend msgspec
+
+class DateField:
+    __slots__ = ('date_time',)
+
+    def __init__(self, date_time=None):
+        self.date_time = date_time
+
+class Author:
+    __slots__ = ('family', 'given', 'orcid')
+
+    def __init__(self, family=None, given=None, orcid=None):
+        self.family = family
+        self.given = given
+        self.orcid = orcid
+
+class RelationTarget:
+    __slots__ = ('id',)
+
+    def __init__(self, id=None):
+        self.id = id
+
+class Relation:
+    __slots__ = ('is_review_of',)
+
+    def __init__(self, is_review_of=()):
+        self.is_review_of = is_review_of
+
+class CrossrefItem:
+    __slots__ = ('doi', 'url', 'type', 'created', 'indexed', 'issn', 'container_title', 'author', 'relation')
+
+    def __init__(self, doi=None, url=None, type=None, created=None, indexed=None, issn=(), container_title=(), author=(), relation=None):
+        self.doi = doi
+        self.url = url
+        self.type = type
+        self.created = created if created is not None else DateField()
+        self.indexed = indexed if indexed is not None else DateField()
+        self.issn = issn
+        self.container_title = container_title
+        self.author = author
+        self.relation = relation if relation is not None else Relation()
+
+    @classmethod
+    def from_dict(cls, item):
+        relation = item.get('relation') or {}
+        return cls(
+            doi=item.get('DOI'),
+            url=item.get('URL'),
+            type=item.get('type'),
+            created=DateField(_date_time(item.get('created'))),
+            indexed=DateField(_date_time(item.get('indexed'))),
+            issn=item.get('ISSN') or (),
+            container_title=item.get('container-title') or (),
+            author=[Author(a.get('family'), a.get('given'), a.get('ORCID')) for a in item.get('author') or ()],
+            relation=Relation([RelationTarget(r.get('id')) for r in relation.get('is-review-of') or ()]),
+        )
+
+def _date_time(field):
+    # date-time non stringa (dump malformati): si tiene come testo, i writer ne prendono [:10]
+    value = (field or {}).get('date-time')
+    return value if value is None or isinstance(value, str) else str(value)
+
+class JsonDecoder:
+    name = 'json'
+
+    def decode(self, data):
+        try:
+            json_data = json.loads(data)
+        except json.JSONDecodeError as e:
+            raise DecodeError(str(e))
+
+        if isinstance(json_data, dict) and 'items' in json_data:
+            items = json_data['items']
+        elif isinstance(json_data, list):
+            items = json_data
+        else:
+            raise DecodeError("JSON structure not recognized")
+
+        return [CrossrefItem.from_dict(item) for item in items]
+
+# Backend msgspec: decodifica solo i campi dichiarati negli Struct, saltando gli altri
+
+if msgspec is not None:
+    class _DateField(msgspec.Struct):
+        date_time: Optional[str] = msgspec.field(name="date-time", default=None)
+
+    class _Author(msgspec.Struct):
+        family: Optional[str] = None
+        given: Optional[str] = None
+        orcid: Optional[str] = msgspec.field(name="ORCID", default=None)
+
+    class _RelationTarget(msgspec.Struct):
+        id: Optional[str] = None
+
+    class _Relation(msgspec.Struct):
+        is_review_of: Optional[list[_RelationTarget]] = msgspec.field(name="is-review-of", default_factory=list)
+
+        def __post_init__(self):
+            if self.is_review_of is None:
+                self.is_review_of = []
+
+    class _CrossrefItem(msgspec.Struct):
+        # null è ammesso come nel backend json e normalizzato agli stessi valori vuoti
+        doi: Optional[str] = msgspec.field(name="DOI", default=None)
+        url: Optional[str] = msgspec.field(name="URL", default=None)
+        type: Optional[str] = None
+        created: Optional[_DateField] = msgspec.field(default_factory=_DateField)
+        indexed: Optional[_DateField] = msgspec.field(default_factory=_DateField)
+        issn: Optional[list[str]] = msgspec.field(name="ISSN", default_factory=list)
+        container_title: Optional[list[str]] = msgspec.field(name="container-title", default_factory=list)
+        author: Optional[list[_Author]] = msgspec.field(default_factory=list)
+        relation: Optional[_Relation] = msgspec.field(default_factory=_Relation)
+
+        def __post_init__(self):
+            if self.created is None:
+                self.created = _DateField()
+            if self.indexed is None:
+                self.indexed = _DateField()
+            if self.issn is None:
+                self.issn = []
+            if self.container_title is None:
+                self.container_title = []
+            if self.author is None:
+                self.author = []
+            if self.relation is None:
+                self.relation = _Relation()
+
+    class _CrossrefPage(msgspec.Struct):
+        items: list[_CrossrefItem]
+
+class MsgspecDecoder:
+    name = 'msgspec'
+
+    def __init__(self):
+        if msgspec is None:
+            raise ImportError("The msgspec decoder requires the msgspec package (pip install msgspec)")
+        self.decoder = msgspec.json.Decoder(Union[_CrossrefPage, list[_CrossrefItem]])
+        self.fallback = JsonDecoder()
+
+    def decode(self, data):
+        try:
+            json_data = self.decoder.decode(data)
+        except msgspec.ValidationError:
+            # tipi inattesi in qualche item (es. date-time non stringa): invece di perdere
+            # l'intero file lo si rilegge con il backend json, che non valida i tipi
+            return self.fallback.decode(data)
+        except msgspec.DecodeError as e:
+            raise DecodeError(str(e))
+
+        if isinstance(json_data, list):
+            return json_data
+        return json_data.items
+
+def get_decoder(name='auto'):
+    if name == 'auto':
+        name = 'msgspec' if msgspec is not None else 'json'
+    if name == 'msgspec':
+        return MsgspecDecoder()
+    if name == 'json':
+        return JsonDecoder()
+    raise ValueError(f"Unknown decoder: {name}")
@@ -0,0 +1,58 @@
+import numpy as np
+import polars as pl
+
+KEY_COLUMNS = {"citing_doi": "citing_key", "cited_doi": "cited_key"}
+
+# chiave surrogata a 64 bit: i byte UTF-8 del DOI normalizzato, letti a parole di 8 byte
+# little-endian (l'ultima completata con zeri), passano per il mixer di splitmix64 partendo
+# dalla lunghezza. A differenza di Series.hash è stabile tra versioni di polars.
+GOLDEN = 0x9E3779B97F4A7C15
+MIX_1 = 0xBF58476D1CE4E5B9
+MIX_2 = 0x94D049BB133111EB
+
+def normalize_doi(doi):
+    # stessa normalizzazione usata per il join: spazi, newline e punti ai bordi, minuscolo
+    return doi.strip().strip("\n.").lower()
+
+def normalize_doi_expr(column="cited_doi"):
+    return pl.col(column).str.strip_chars().str.strip_chars("\n.").str.to_lowercase()
+
+def mix_array(h):
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(MIX_1)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(MIX_2)
+    return h ^ (h >> np.uint64(31))
+
+def doi_keys(dois):
+    # i DOI sono raggruppati per numero di parole e ogni gruppo diventa una matrice uint64:
+    # il ciclo Python è sulle parole, non sulle righe (intero con segno per stare in un Int64)
+    normalized = dois.cast(pl.Utf8).to_frame("doi").select(normalize_doi_expr("doi"))["doi"]
+    valid = normalized.is_not_null().to_numpy()
+    present = normalized.drop_nulls()
+    lengths = present.str.len_bytes().to_numpy().astype(np.uint64)
+    values = present.cast(pl.Binary).to_numpy()
+    words = (lengths + np.uint64(7)) // np.uint64(8)
+    hashes = lengths * np.uint64(GOLDEN)
+    for width in np.unique(words[words > 0]):
+        rows = np.flatnonzero(words == width)
+        matrix = values[rows].astype(f"S{width * 8}").view("<u8").reshape(len(rows), int(width))
+        group = hashes[rows]
+        for word in range(int(width)):
+            group = mix_array(group ^ matrix[:, word])
+        hashes[rows] = group
+    keys = np.zeros(len(valid), dtype=np.int64)
+    keys[valid] = mix_array(hashes).view(np.int64)
+    return pl.Series(dois.name, keys).scatter(np.flatnonzero(~valid), None)
+
+def doi_key_expr(column):
+    # per i CSV estratti prima che esistessero le colonne *_key
+    return pl.col(column).map_batches(doi_keys, return_dtype=pl.Int64)
+
+def doi_key_column(names, column):
+    # colonna *_key già presente nel file, altrimenti calcolata dal DOI
+    key = KEY_COLUMNS[column]
+    return (pl.col(key).cast(pl.Int64) if key in names else doi_key_expr(column)).alias(key)
+
+def with_doi_keys(df, columns=("citing_doi", "cited_doi")):
+    names = df.collect_schema().names()
+    missing = [doi_key_column(names, column) for column in columns if column in names and KEY_COLUMNS[column] not in names]
+    return df.with_columns(missing) if missing else df
@@ -0,0 +1,123 @@
+import os
+import mmap
+import tarfile
+import zipfile
+from collections import namedtuple
+
+READ_BUFFER_SIZE = 8 * 1024 * 1024
+MEMBER_SUFFIX = ".json.gz"
+
+SourceMember = namedtuple('SourceMember', ['name', 'size', 'ref'])
+
+class ZipSource:
+    def __init__(self, path, buffer_size=READ_BUFFER_SIZE):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.file = None
+        self.archive = None
+
+    def __enter__(self):
+        self.file = open(self.path, 'rb', buffering=self.buffer_size)
+        self.archive = zipfile.ZipFile(self.file, 'r')
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def members(self):
+        # ordinati per posizione nell'archivio, così la lettura resta sequenziale
+        infos = sorted(self.archive.infolist(), key=lambda info: info.header_offset)
+        return [SourceMember(info.filename, info.file_size, info) for info in infos if info.filename.endswith(MEMBER_SUFFIX)]
+
+    def read(self, member):
+        with self.archive.open(member.ref) as member_file:
+            return member_file.read()
+
+    def fingerprint(self, member):
+        return f"{member.size}:{member.ref.CRC}"
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+        if self.file is not None:
+            self.file.close()
+
+class TarSource:
+    def __init__(self, path, buffer_size=READ_BUFFER_SIZE):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.file = None
+        self.archive = None
+
+    def __enter__(self):
+        self.file = open(self.path, 'rb', buffering=self.buffer_size)
+        self.archive = tarfile.open(fileobj=self.file, mode='r:*')
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def members(self):
+        infos = sorted(self.archive.getmembers(), key=lambda info: info.offset_data)
+        return [SourceMember(info.name, info.size, info) for info in infos if info.isfile() and info.name.endswith(MEMBER_SUFFIX)]
+
+    def read(self, member):
+        return self.archive.extractfile(member.ref).read()
+
+    def fingerprint(self, member):
+        return f"{member.size}:{member.ref.mtime}"
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+        if self.file is not None:
+            self.file.close()
+
+class DirectorySource:
+    def __init__(self, path, buffer_size=READ_BUFFER_SIZE, use_mmap=False):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.use_mmap = use_mmap
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def members(self):
+        members = []
+        for root, dirs, files in os.walk(self.path):
+            dirs.sort()
+            for file in sorted(files):
+                if file.endswith(MEMBER_SUFFIX):
+                    file_path = os.path.join(root, file)
+                    name = os.path.relpath(file_path, self.path).replace(os.sep, '/')
+                    members.append(SourceMember(name, os.path.getsize(file_path), file_path))
+        return members
+
+    def read(self, member):
+        with open(member.ref, 'rb', buffering=0) as member_file:
+            if self.use_mmap and member.size > 0:
+                with mmap.mmap(member_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                        mapped.madvise(mmap.MADV_SEQUENTIAL)
+                    return mapped[:]
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(member_file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            return member_file.read()
+
+    def fingerprint(self, member):
+        return f"{member.size}:{os.stat(member.ref).st_mtime_ns}"
+
+    def close(self):
+        pass
+
+def open_source(path, use_mmap=False, buffer_size=READ_BUFFER_SIZE):
+    if os.path.isdir(path):
+        return DirectorySource(path, buffer_size, use_mmap)
+    if zipfile.is_zipfile(path):
+        return ZipSource(path, buffer_size)
+    if tarfile.is_tarfile(path):
+        return TarSource(path, buffer_size)
+    raise ValueError(f"Unsupported input source: {path} (expected a ZIP, a tar or a directory of {MEMBER_SUFFIX} files)")
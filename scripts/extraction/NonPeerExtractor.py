@@ -1,69 +1,99 @@
-import zipfile
 import gzip
-import json
+import threading
 import csv
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import argparse
 from tqdm import tqdm
+from extraction.Decoders import get_decoder, DecodeError
+from extraction.InputSource import open_source
+from extraction.Pipeline import ExtractionPipeline
+from extraction.Sharding import select_shard
+from extraction.DoiKeys import normalize_doi, doi_keys
+import polars as pl
 import os
 
 class NonPeerExtractor:
-    def __init__(self, zip_filename, batch_size=10, max_workers=2):
-        self.zip_filename = zip_filename
+    def __init__(self, input_path, batch_size=10, max_workers=2, use_mmap=False, read_ahead=None, shard=None, shard_strategy='hash', decoder='auto', since=None):
+        self.input_path = input_path
         self.batch_size = batch_size
         self.max_workers = max_workers
+        self.use_mmap = use_mmap
+        self.read_ahead = read_ahead
+        self.shard = shard
+        self.shard_strategy = shard_strategy
+        self.decoder = get_decoder(decoder)
+        # solo gli item con indexed.date-time successivo a since (aggiornamenti incrementali)
+        self.since = since
+        self.max_indexed = None
+        self.indexed_lock = threading.Lock()
 
-    def process_files(self, csv_writer, max_files=None):
+    def process_files(self, csv_writer, max_files=None, member_filter=None):
         print("Using NonPeerExtractor")
-        with zipfile.ZipFile(self.zip_filename, 'r') as zip_file:
-            file_infos = [file_info for file_info in zip_file.infolist() if file_info.filename.endswith(".json.gz")]
-            
-            if max_files:
-                file_infos = file_infos[:max_files]
-            
-            for batch in self.batch(file_infos, self.batch_size):
-                non_peer_review_items = self.process_batch(zip_file, batch)
-                csv_writer.write_to_csv(non_peer_review_items)
+        with open_source(self.input_path, self.use_mmap) as source:
+            members = source.members()
 
-    def batch(self, iterable, n=1):
-        length = len(iterable)
-        for ndx in range(0, length, n):
-            yield iterable[ndx:min(ndx + n, length)]
+            if self.shard:
+                members = select_shard(members, self.shard, self.shard_strategy)
+                print(f"Shard {self.shard[0]}/{self.shard[1]}: {len(members)} files")
 
-    def process_batch(self, zip_file, batch):
-        non_peer_review_items = []
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = [executor.submit(self.process_file, zip_file, file_info) for file_info in batch]
-            for future in tqdm(as_completed(futures), total=len(futures), desc="Processing batch"):
-                non_peer_review_items.extend(future.result())
-        return non_peer_review_items
+            if member_filter:
+                members = [member for member in members if member_filter(source, member)]
 
-    def process_file(self, zip_file, file_info):
-        with zip_file.open(file_info) as compressed_file:
-            compressed_data = compressed_file.read()
-            return self.process_json_data(compressed_data)
+            if max_files:
+                members = members[:max_files]
+
+            pipeline = ExtractionPipeline(self.process_json_data, csv_writer, self.batch_size, self.max_workers, self.read_ahead)
+            pipeline.run(source, members)
 
     def process_json_data(self, compressed_data):
         decompressed_data = gzip.decompress(compressed_data)
-        decoded_data = decompressed_data.decode('utf-8')
-        
-        try:
-            json_data = json.loads(decoded_data)
-        except json.JSONDecodeError:
-            print("Decoding error because of: ", decoded_data)
-            return []
 
-        if isinstance(json_data, dict) and 'items' in json_data:
-            items = json_data['items']
-        elif isinstance(json_data, list):
-            items = json_data
-        else:
-            print("JSON structure not recognized: ", json_data)
+        try:
+            items = self.decoder.decode(decompressed_data)
+        except DecodeError as e:
+            print("Decoding error because of: ", e)
             return []
 
-        non_peer_review_items = [item for item in items if item.get('type') != 'peer-review']
+        non_peer_review_items = []
+        max_indexed = ""
+        for item in items:
+            indexed = item.indexed.date_time or ""
+            if indexed > max_indexed:
+                max_indexed = indexed
+            if self.since and indexed <= self.since:
+                continue
+            if item.type != 'peer-review' and item.doi and item.url:
+                non_peer_review_items.append(self.project_item(item))
+        self.update_max_indexed(max_indexed)
         return non_peer_review_items
 
+    def update_max_indexed(self, indexed):
+        with self.indexed_lock:
+            if indexed and (self.max_indexed is None or indexed > self.max_indexed):
+                self.max_indexed = indexed
+
+    def project_item(self, element):
+        cited_doi = normalize_doi(element.doi)
+        return NonPeerRecord(
+            cited_doi,
+            element.url,
+            ', '.join(element.issn),
+            ', '.join(element.container_title),
+            (element.created.date_time or "")[:10],
+            element.indexed.date_time or ""
+        )
+
+class NonPeerRecord:
+    __slots__ = ('cited_doi', 'cited_url', 'cited_issn', 'cited_venue', 'cited_date', 'cited_indexed')
+
+    def __init__(self, cited_doi, cited_url, cited_issn, cited_venue, cited_date, cited_indexed):
+        self.cited_doi = cited_doi
+        self.cited_url = cited_url
+        self.cited_issn = cited_issn
+        self.cited_venue = cited_venue
+        self.cited_date = cited_date
+        # indexed.date-time dell'item: decide quale versione tenere quando un DOI compare più volte
+        self.cited_indexed = cited_indexed
+
 class CSVWriterNonPeer:
     def __init__(self, output_filenames):
         if isinstance(output_filenames, str):
@@ -73,6 +103,8 @@ class CSVWriterNonPeer:
         self.header_written = False
 
     def write_to_csv(self, non_peer_review_items):
+        # chiavi intere calcolate una volta per batch
+        cited_keys = doi_keys(pl.Series([record.cited_doi for record in non_peer_review_items], dtype=pl.Utf8)).to_list()
         for output_filename in self.output_filenames:
             # Creazione automatica della directory
             output_dir = os.path.dirname(output_filename)
@@ -81,23 +113,12 @@ class CSVWriterNonPeer:
                 os.makedirs(output_dir)
             
             with open(output_filename, 'a', newline='', encoding='utf-8') as output_file:
-                fieldnames = ['cited_doi', 'cited_url', 'cited_issn', 'cited_venue', 'cited_date']
-                writer = csv.DictWriter(output_file, fieldnames=fieldnames)
+                fieldnames = ['cited_doi', 'cited_url', 'cited_issn', 'cited_venue', 'cited_date', 'cited_indexed', 'cited_key']
+                writer = csv.writer(output_file)
                 if output_file.tell() == 0:
-                    writer.writeheader()
-
-                for element in non_peer_review_items:
-                    doi_a = element.get("DOI")
-                    url_a = element.get("URL")
-                    date_non_peer_review = str(element.get("created", {}).get("date-time", ""))[:10]
-                    issn = ', '.join(element.get('ISSN', []))
-                    container_title = ', '.join(element.get('container-title', []))
-                    if doi_a and url_a:
-                        writer.writerow({
-                            "cited_doi": doi_a,
-                            "cited_url": url_a,
-                            "cited_issn": issn,
-                            "cited_venue": container_title,
-                            "cited_date": date_non_peer_review
-                        })
+                    writer.writerow(fieldnames)
+                writer.writerows(
+                    (record.cited_doi, record.cited_url, record.cited_issn, record.cited_venue, record.cited_date, record.cited_indexed, cited_key)
+                    for record, cited_key in zip(non_peer_review_items, cited_keys)
+                )
             print("Batch saved to", output_filename)
\ No newline at end of file
@@ -1,73 +1,116 @@
-import zipfile
 import gzip
-import json
+import threading
 import csv
 import os
 import errno
 import argparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
+from extraction.Decoders import get_decoder, DecodeError
+from extraction.InputSource import open_source
+from extraction.Pipeline import ExtractionPipeline
+from extraction.Sharding import select_shard
+from extraction.DoiKeys import normalize_doi, doi_keys
 import polars as pl
 
 LOOKUP_CSV = '../data/raw/lookup.csv'
 CROSSREF_CODE = '020'
 
 class PeerExtractor:
-    def __init__(self, zip_filename, batch_size=10, max_workers = 2):
-        self.zip_filename = zip_filename
+    def __init__(self, input_path, batch_size=10, max_workers=2, use_mmap=False, read_ahead=None, shard=None, shard_strategy='hash', decoder='auto', since=None):
+        self.input_path = input_path
         self.batch_size = batch_size
         self.max_workers = max_workers
-
-    def process_files(self, csv_writer, max_files=None):
+        self.use_mmap = use_mmap
+        self.read_ahead = read_ahead
+        self.shard = shard
+        self.shard_strategy = shard_strategy
+        self.decoder = get_decoder(decoder)
+        # solo gli item con indexed.date-time successivo a since (aggiornamenti incrementali)
+        self.since = since
+        self.max_indexed = None
+        self.indexed_lock = threading.Lock()
+
+    def process_files(self, csv_writer, max_files=None, member_filter=None):
         print("Using PeerExtractor")
-        with zipfile.ZipFile(self.zip_filename, 'r') as zip_file:
-            file_infos = [file_info for file_info in zip_file.infolist() if file_info.filename.endswith(".json.gz")]
-            
-            if max_files:
-                file_infos = file_infos[:max_files]
-            
-            for batch in self.batch(file_infos, self.batch_size):
-                peer_review_items = self.process_batch(zip_file, batch)
-                csv_writer.write_to_csv(peer_review_items)
+        with open_source(self.input_path, self.use_mmap) as source:
+            members = source.members()
 
-    def batch(self, iterable, n=1):
-        length = len(iterable)
-        for ndx in range(0, length, n):
-            yield iterable[ndx:min(ndx + n, length)]
+            if self.shard:
+                members = select_shard(members, self.shard, self.shard_strategy)
+                print(f"Shard {self.shard[0]}/{self.shard[1]}: {len(members)} files")
 
-    def process_batch(self, zip_file, batch):
-        peer_review_items = []
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = [executor.submit(self.process_file, zip_file, file_info) for file_info in batch]
-            for future in tqdm(as_completed(futures), total=len(futures), desc="Processing batch"):
-                peer_review_items.extend(future.result())
-        return peer_review_items
+            if member_filter:
+                members = [member for member in members if member_filter(source, member)]
 
-    def process_file(self, zip_file, file_info):
-        with zip_file.open(file_info) as compressed_file:
-            compressed_data = compressed_file.read()
-            return self.process_json_data(compressed_data)
+            if max_files:
+                members = members[:max_files]
+
+            pipeline = ExtractionPipeline(self.process_json_data, csv_writer, self.batch_size, self.max_workers, self.read_ahead)
+            pipeline.run(source, members)
 
     def process_json_data(self, compressed_data):
         decompressed_data = gzip.decompress(compressed_data)
-        decoded_data = decompressed_data.decode('utf-8')
-        
+
         try:
-            json_data = json.loads(decoded_data)
-        except json.JSONDecodeError:
-            print("Decoding errore because of: ", decoded_data)
+            items = self.decoder.decode(decompressed_data)
+        except DecodeError as e:
+            print("Decoding errore because of: ", e)
             return []
 
-        if isinstance(json_data, dict) and 'items' in json_data:
-            items = json_data['items']
-        elif isinstance(json_data, list):
-            items = json_data
-        else:
-            print("Json structure not recognized: ", json_data)
+        peer_review_items = []
+        max_indexed = ""
+        for item in items:
+            indexed = item.indexed.date_time or ""
+            if indexed > max_indexed:
+                max_indexed = indexed
+            if self.since and indexed <= self.since:
+                continue
+            if item.type == 'peer-review':
+                peer_review_items.extend(self.project_item(item))
+        self.update_max_indexed(max_indexed)
+        return peer_review_items
+
+    def update_max_indexed(self, indexed):
+        with self.indexed_lock:
+            if indexed and (self.max_indexed is None or indexed > self.max_indexed):
+                self.max_indexed = indexed
+
+    def project_item(self, element):
+        # un record compatto per ogni articolo recensito, costruito appena l'item è decodificato
+        doi_p = element.doi or ""
+        if not doi_p:
             return []
 
-        peer_review_items = [item for item in items if item.get('type') == 'peer-review']
-        return peer_review_items
+        date_peer_review = (element.created.date_time or "")[:10]
+
+        # Estrazione informazioni sugli autori
+        author_list = []
+        for author in element.author:
+            family_name = (author.family or "").strip()
+            given_name = (author.given or "").strip()
+
+            if family_name and given_name:
+                author_info = f"{family_name}, {given_name}"
+            else:
+                author_info = family_name  # Solo il cognome se manca il nome
+
+            orcid = author.orcid or ""
+            author_list.append(f"{author_info} (ORCID: {orcid})" if orcid else author_info)
+
+        author_info_str = "; ".join(author_list)
+
+        return [PeerReviewRecord(doi_p, i.id, date_peer_review, element.url, author_info_str)
+                for i in element.relation.is_review_of if i.id]
+
+class PeerReviewRecord:
+    __slots__ = ('citing_doi', 'cited_doi', 'citing_date', 'citing_url', 'author_info')
+
+    def __init__(self, citing_doi, cited_doi, citing_date, citing_url, author_info):
+        self.citing_doi = citing_doi
+        self.cited_doi = cited_doi
+        self.citing_date = citing_date
+        self.citing_url = citing_url
+        self.author_info = author_info
 
 class OciProcess:
     def __init__(self, lookup_csv=LOOKUP_CSV, crossref_code=CROSSREF_CODE):
@@ -131,8 +174,26 @@ class CSVWriterPeer:
         else:
             self.output_filenames = output_filenames
         self.header_written = False
+        self.oci_processor = None
 
     def write_to_csv(self, peer_review_items):
+        if self.oci_processor is None:
+            self.oci_processor = OciProcess()
+
+        rows = []
+        for record in peer_review_items:
+            citing_entity_local_id = self.oci_processor.convert_doi_to_ci(record.citing_doi)
+            cited_entity_local_id = self.oci_processor.convert_doi_to_ci(record.cited_doi)
+            oci = "oci:" + citing_entity_local_id + "-" + cited_entity_local_id
+            # l'OCI resta calcolato sul DOI originale; nel CSV i DOI sono normalizzati e affiancati dalle chiavi intere
+            citing_doi = normalize_doi(record.citing_doi)
+            cited_doi = normalize_doi(record.cited_doi)
+            rows.append((oci, citing_doi, cited_doi, record.citing_date, record.citing_url, record.author_info))
+        # chiavi intere calcolate una volta per batch
+        citing_keys = doi_keys(pl.Series([row[1] for row in rows], dtype=pl.Utf8)).to_list()
+        cited_keys = doi_keys(pl.Series([row[2] for row in rows], dtype=pl.Utf8)).to_list()
+        rows = [row + keys for row, keys in zip(rows, zip(citing_keys, cited_keys))]
+
         for output_filename in self.output_filenames:
             # Creazione automatica della directory
             output_dir = os.path.dirname(output_filename)
@@ -141,48 +202,11 @@ class CSVWriterPeer:
                 os.makedirs(output_dir)
             
             with open(output_filename, 'a', newline='', encoding='utf-8') as output_file:
-                fieldnames = ["oci", "citing_doi", "cited_doi", "citing_date", "citing_url", "author_info"]
-                writer = csv.DictWriter(output_file, fieldnames=fieldnames)
+                fieldnames = ["oci", "citing_doi", "cited_doi", "citing_date", "citing_url", "author_info", "citing_key", "cited_key"]
+                writer = csv.writer(output_file)
                 if output_file.tell() == 0:
-                    writer.writeheader()
-
-                oci_processor = OciProcess()
-
-                for element in peer_review_items:
-                    for i in element.get("relation", {}).get("is-review-of", []):
-                        doi_p = element["DOI"]
-                        doi_a = i.get("id", "")
-                        url_p = element["URL"]
-                        citing_entity_local_id = oci_processor.convert_doi_to_ci(doi_p)
-                        cited_entity_local_id = oci_processor.convert_doi_to_ci(doi_a)
-                        oci = "oci:" + citing_entity_local_id + "-" + cited_entity_local_id
-                        date_peer_review = str(element["created"]["date-time"])[:10]
-
-                        # Estrazione informazioni sugli autori
-                        author_list = []
-                        for author in element.get("author", []):
-                            family_name = author.get("family", "").strip()
-                            given_name = author.get("given", "").strip()
-                            
-                            if family_name and given_name:
-                                author_info = f"{family_name}, {given_name}"
-                            else:
-                                author_info = family_name  # Solo il cognome se manca il nome
-
-                            orcid = author.get("ORCID", "")
-                            author_list.append(f"{author_info} (ORCID: {orcid})" if orcid else author_info)
-
-                        author_info_str = "; ".join(author_list)
-
-                        if doi_p and doi_a:
-                            writer.writerow({
-                                "oci": oci,
-                                "citing_doi": doi_p,
-                                "cited_doi": doi_a,
-                                "citing_date": date_peer_review,
-                                "citing_url": url_p,
-                                "author_info": author_info_str
-                            })
+                    writer.writerow(fieldnames)
+                writer.writerows(rows)
             print("peer items saved to", output_filename)
 
     def remove_duplicates(self, input_filename, output_filename):
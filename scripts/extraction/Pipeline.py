@@ -0,0 +1,90 @@
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+
+_DONE = object()
+
+class ExtractionPipeline:
+    # read-ahead -> decode workers -> writer, connected by bounded queues so that
+    # reading, parsing and writing overlap instead of waiting on batch barriers;
+    # queue_size is how many members the reader may fetch ahead of the decoders
+    def __init__(self, process_json_data, csv_writer, batch_size=10, max_workers=2, queue_size=None):
+        self.process_json_data = process_json_data
+        self.csv_writer = csv_writer
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.queue_size = queue_size or max(2, max_workers * 2)
+        self.errors = []
+
+    def run(self, source, members):
+        read_queue = queue.Queue(maxsize=self.queue_size)
+        write_queue = queue.Queue(maxsize=self.queue_size)
+        self.errors = []
+
+        reader = threading.Thread(target=self.read_stage, args=(source, members, read_queue), daemon=True)
+        writer = threading.Thread(target=self.write_stage, args=(write_queue, len(members)), daemon=True)
+        reader.start()
+        writer.start()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            decoders = [executor.submit(self.decode_stage, read_queue, write_queue) for _ in range(self.max_workers)]
+            for decoder in decoders:
+                decoder.result()
+
+        reader.join()
+        write_queue.put(_DONE)
+        writer.join()
+
+        if self.errors:
+            raise self.errors[0]
+
+    def read_stage(self, source, members, read_queue):
+        try:
+            for member in members:
+                if self.errors:
+                    break
+                read_queue.put(source.read(member))
+        except Exception as e:
+            self.errors.append(e)
+        finally:
+            for _ in range(self.max_workers):
+                read_queue.put(_DONE)
+
+    def decode_stage(self, read_queue, write_queue):
+        while True:
+            compressed_data = read_queue.get()
+            if compressed_data is _DONE:
+                return
+            if self.errors:
+                continue
+            try:
+                write_queue.put(self.process_json_data(compressed_data))
+            except Exception as e:
+                self.errors.append(e)
+
+    def write_stage(self, write_queue, total):
+        pending = []
+        pending_files = 0
+        with tqdm(total=total, desc="Processing files") as progress:
+            while True:
+                items = write_queue.get()
+                if items is _DONE:
+                    break
+                pending.extend(items)
+                pending_files += 1
+                progress.update(1)
+                if pending_files >= self.batch_size:
+                    self.flush(pending)
+                    pending = []
+                    pending_files = 0
+            if pending_files or total == 0:
+                self.flush(pending)
+
+    def flush(self, items):
+        if self.errors:
+            return
+        try:
+            self.csv_writer.write_to_csv(items)
+        except Exception as e:
+            self.errors.append(e)
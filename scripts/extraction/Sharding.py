@@ -0,0 +1,37 @@
+import zlib
+
+SHARD_STRATEGIES = ('hash', 'size')
+
+def parse_shard(value):
+    # "i/N", con 0 <= i < N
+    index, _, count = value.partition('/')
+    index, count = int(index), int(count)
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {value}: expected i/N with 0 <= i < N")
+    return index, count
+
+def shard_suffix(shard):
+    index, count = shard
+    return f"_shard{index}of{count}"
+
+def select_shard(members, shard, strategy='hash'):
+    index, count = shard
+    if count == 1:
+        return list(members)
+
+    if strategy == 'hash':
+        # crc32 del nome: stabile tra processi e macchine, a differenza di hash()
+        return [member for member in members if zlib.crc32(member.name.encode('utf-8')) % count == index]
+
+    if strategy == 'size':
+        # assegnazione greedy al nodo meno carico, dai file più grandi ai più piccoli
+        loads = [0] * count
+        assigned = set()
+        for member in sorted(members, key=lambda m: (-m.size, m.name)):
+            target = min(range(count), key=lambda i: (loads[i], i))
+            loads[target] += member.size
+            if target == index:
+                assigned.add(member.name)
+        return [member for member in members if member.name in assigned]
+
+    raise ValueError(f"Unknown shard strategy: {strategy}")
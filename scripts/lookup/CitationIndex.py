@@ -0,0 +1,141 @@
+import os
+import json
+import mmap
+import numpy as np
+import polars as pl
+
+KEY_COLUMNS = ["citing_doi", "cited_doi", "oci"]
+DOI_KEYS = {"citing_doi", "cited_doi"}
+META_FILE = "meta.json"
+
+def normalize_key(key_name, value):
+    value = value.strip()
+    if key_name in DOI_KEYS:
+        return value.strip("\n.").lower()
+    return value
+
+class CitationIndexBuilder:
+    # Layout su disco: per ogni colonna un blob di valori concatenati + offset
+    # uint64 (row store colonnare); per ogni chiave un blob di chiavi ordinate
+    # per byte, i relativi offset e l'id della riga a cui ogni chiave punta.
+    def __init__(self, index_dir, key_columns=KEY_COLUMNS):
+        self.index_dir = index_dir
+        self.key_columns = key_columns
+
+    def build(self, csv_path):
+        os.makedirs(self.index_dir, exist_ok=True)
+        df = pl.read_csv(csv_path, infer_schema=False).fill_null("")
+
+        missing = [key for key in self.key_columns if key not in df.columns]
+        if missing:
+            raise ValueError(f"Columns {missing} are not present in {csv_path}")
+
+        for column in df.columns:
+            self.write_strings(df[column], f"col_{column}")
+
+        for key in self.key_columns:
+            keys = df.select(
+                pl.col(key).str.strip_chars().str.strip_chars("\n.").str.to_lowercase() if key in DOI_KEYS else pl.col(key).str.strip_chars(),
+                pl.int_range(pl.len(), dtype=pl.UInt32).alias("row")
+            ).filter(pl.col(key) != "").sort(key)
+            self.write_strings(keys[key], f"key_{key}")
+            keys["row"].to_numpy().astype(np.uint32).tofile(os.path.join(self.index_dir, f"key_{key}.row"))
+
+        with open(os.path.join(self.index_dir, META_FILE), 'w', encoding='utf-8') as meta_file:
+            json.dump({"columns": df.columns, "keys": self.key_columns, "rows": df.height}, meta_file)
+        print(f"Citation index with {df.height} rows saved to {self.index_dir}")
+
+    def write_strings(self, series, name):
+        lengths = series.str.len_bytes().to_numpy().astype(np.uint64)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.uint64)
+        np.cumsum(lengths, out=offsets[1:])
+        offsets.tofile(os.path.join(self.index_dir, f"{name}.off"))
+        with open(os.path.join(self.index_dir, f"{name}.dat"), 'wb') as data_file:
+            data_file.write(series.str.join("").item().encode('utf-8'))
+
+class CitationIndex:
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.maps = []
+        self.views = []
+        with open(os.path.join(index_dir, META_FILE), encoding='utf-8') as meta_file:
+            meta = json.load(meta_file)
+        self.columns = meta["columns"]
+        self.key_columns = meta["keys"]
+        self.rows = meta["rows"]
+        self.column_data = {column: self.open_strings(f"col_{column}") for column in self.columns}
+        self.key_data = {key: self.open_strings(f"key_{key}") for key in self.key_columns}
+        self.key_rows = {key: self.open_array(f"key_{key}.row", 'I') for key in self.key_columns}
+
+    def open_map(self, file_name):
+        path = os.path.join(self.index_dir, file_name)
+        if os.path.getsize(path) == 0:
+            return b""
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.maps.append(mapped)
+        return mapped
+
+    def open_array(self, file_name, fmt):
+        view = memoryview(self.open_map(file_name)).cast(fmt)
+        self.views.append(view)
+        return view
+
+    def open_strings(self, name):
+        return self.open_map(f"{name}.dat"), self.open_array(f"{name}.off", 'Q')
+
+    def close(self):
+        self.column_data = self.key_data = self.key_rows = {}
+        for view in self.views:
+            view.release()
+        self.views = []
+        for mapped in self.maps:
+            mapped.close()
+        self.maps = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lower_bound(self, key_name, target):
+        data, offsets = self.key_data[key_name]
+        low, high = 0, len(offsets) - 1
+        while low < high:
+            mid = (low + high) // 2
+            if data[offsets[mid]:offsets[mid + 1]] < target:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def find_rows(self, key_name, value):
+        if key_name not in self.key_data:
+            raise ValueError(f"{key_name} is not an indexed key: {self.key_columns}")
+        target = normalize_key(key_name, value).encode('utf-8')
+        data, offsets = self.key_data[key_name]
+        rows = self.key_rows[key_name]
+        position = self.lower_bound(key_name, target)
+        found = []
+        while position < len(rows) and data[offsets[position]:offsets[position + 1]] == target:
+            found.append(rows[position])
+            position += 1
+        return found
+
+    def get_row(self, row_id):
+        row = {}
+        for column, (data, offsets) in self.column_data.items():
+            row[column] = data[offsets[row_id]:offsets[row_id + 1]].decode('utf-8')
+        return row
+
+    def lookup(self, key_name, values):
+        return {value: [self.get_row(row_id) for row_id in self.find_rows(key_name, value)] for value in values}
+
+    def reviews_of(self, dois):
+        # quali peer review citano questi DOI
+        return self.lookup("cited_doi", dois)
+
+    def reviewed_by(self, dois):
+        # cosa recensiscono queste peer review
+        return self.lookup("citing_doi", dois)
@@ -0,0 +1,103 @@
+import asyncio
+import json
+from urllib.parse import urlsplit, parse_qs
+
+# endpoint -> (chiave dell'indice, parametro della query string)
+ROUTES = {
+    "/reviews": ("cited_doi", "doi"),
+    "/reviewed": ("citing_doi", "doi"),
+    "/oci": ("oci", "oci"),
+}
+
+class LookupServer:
+    def __init__(self, index, host="127.0.0.1", port=8080):
+        self.index = index
+        self.host = host
+        self.port = port
+
+    def handle_request(self, method, target, body):
+        url = urlsplit(target)
+        if url.path == "/health":
+            return 200, {"status": "ok", "rows": self.index.rows}
+        if url.path not in ROUTES:
+            return 404, {"error": f"Unknown endpoint {url.path}", "endpoints": sorted(ROUTES)}
+
+        key_name, param = ROUTES[url.path]
+        values = parse_qs(url.query).get(param, [])
+        if method == "POST" and body:
+            # lookup batch: {"doi": [...]} oppure {"oci": [...]}
+            try:
+                body_values = json.loads(body).get(param, [])
+            except (ValueError, AttributeError, TypeError):
+                return 400, {"error": "Invalid JSON body"}
+            if isinstance(body_values, str):
+                body_values = [body_values]
+            if not isinstance(body_values, list) or not all(isinstance(value, str) for value in body_values):
+                return 400, {"error": f"'{param}' must be a string or a list of strings"}
+            try:
+                # json.loads accetta surrogati isolati ("\ud800") che non si possono codificare in UTF-8
+                for value in body_values:
+                    value.encode('utf-8')
+            except UnicodeEncodeError:
+                return 400, {"error": f"'{param}' contains invalid Unicode"}
+            values += body_values
+        if not values:
+            return 400, {"error": f"Missing '{param}' parameter"}
+        return 200, {"results": self.index.lookup(key_name, values)}
+
+    async def write_response(self, writer, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found"}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode('latin-1')
+            + data
+        )
+        await writer.drain()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split(" ", 2)
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode('latin-1').partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    # senza una lunghezza valida non si sa dove finisce il body: 400 e chiusura
+                    await self.write_response(writer, 400, {"error": "Invalid Content-Length header"})
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = self.handle_request(method, target, body)
+                await self.write_response(writer, status, payload)
+                connection = headers.get("connection", "").lower()
+                if connection == "close" or (version.strip() == "HTTP/1.0" and connection != "keep-alive"):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        print(f"Lookup service listening on http://{self.host}:{self.port} ({', '.join(sorted(ROUTES))})")
+        async with server:
+            await server.serve_forever()
+
+    def run(self):
+        asyncio.run(self.serve())
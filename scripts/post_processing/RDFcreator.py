@@ -3,6 +3,7 @@ from dateutil.relativedelta import relativedelta
 from dateutil.parser import parse
 from datetime import datetime
 import csv
+import hashlib
 from io import StringIO
 from urllib.parse import quote
 import os
@@ -54,7 +55,8 @@ class PeerReview(object):
             peer_review_graph.add((citation, RDF.type, self._citation))
             peer_review_graph.add((citation, self._has_citation_characterization, self._reviews))
 
-            if self.citing_date is not None:
+            # senza data (o senza time span) la tripla viene omessa: "" non è un letterale valido
+            if self.citing_date:
                 if PeerReview.contains_days(self.citing_date):
                     xsd_type = XSD.date
                 elif PeerReview.contains_months(self.citing_date):
@@ -64,7 +66,7 @@ class PeerReview(object):
 
                 peer_review_graph.add((citation, self._has_citation_creation_date,
                                     Literal(self.citing_date, datatype=xsd_type, normalize=False)))
-                if self.time_span is not None:
+                if self.time_span:
                     peer_review_graph.add((citation, self._has_citation_time_span,
                                         Literal(self.time_span, datatype=XSD.duration)))
 
@@ -90,8 +92,77 @@ class PeerReview(object):
     def contains_days(date):
         return date is not None and len(date) >= 10
 
-def populate_data(csv_file, output_file, base_url, include_data=True, include_prov=False):
-    with open(csv_file, mode='r', encoding='utf-8') as file:
+class FingerprintStore(object):
+    # Fingerprint compatto (blake2b a 64 bit) dei campi di ogni OCI pubblicati nel rilascio
+    # precedente: permette di generare triple solo per le citazioni nuove o modificate
+    # e di elencare quelle rimosse.
+    def __init__(self, path):
+        self.path = path
+        self.previous = self.load()
+        self.current = {}
+        # OCI già pubblicati con un fingerprint diverso: le triple vecchie vanno sostituite
+        self.changed = []
+
+    def load(self):
+        previous = {}
+        if os.path.isfile(self.path):
+            with open(self.path, mode='r', encoding='utf-8') as file:
+                reader = csv.reader(file)
+                next(reader, None)
+                for oci, fingerprint in reader:
+                    previous[oci] = int(fingerprint, 16)
+        return previous
+
+    @staticmethod
+    def compute(*values):
+        data = "\x1f".join(value or "" for value in values).encode('utf-8')
+        return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+    def is_changed(self, oci, *values):
+        # un OCI ripetuto nell'input (es. CSV grezzo e _unique) è già stato confrontato
+        if oci in self.current:
+            return False
+        fingerprint = self.compute(*values)
+        self.current[oci] = fingerprint
+        previous = self.previous.pop(oci, None)
+        if previous is not None and previous != fingerprint:
+            self.changed.append(oci)
+        return previous != fingerprint
+
+    def removed(self):
+        # quanto resta di previous dopo il passaggio sull'input non è più presente
+        return [oci for oci in self.previous if oci not in self.current]
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(['oci', 'fingerprint'])
+            writer.writerows((oci, format(fingerprint, '016x')) for oci, fingerprint in self.current.items())
+        os.replace(tmp_path, self.path)
+
+    def write_removed(self, removed_file, base_url):
+        return self.write_iris(removed_file, self.removed(), base_url)
+
+    def write_replaced(self, replaced_file, base_url):
+        return self.write_iris(replaced_file, self.changed, base_url)
+
+    @staticmethod
+    def write_iris(output_file, ocis, base_url):
+        with open(output_file, 'w', newline='', encoding='utf-8') as f:
+            for oci in ocis:
+                f.write(base_url + "ci/" + oci[4:] + "\n")
+        return len(ocis)
+
+def output_mode(fingerprints):
+    # un rilascio incrementale è un file a sé: non va accodato alle triple del rilascio precedente
+    return 'w' if fingerprints is not None else 'a'
+
+def populate_data(csv_file, output_file, base_url, include_data=True, include_prov=False, fingerprints=None):
+    with open(csv_file, mode='r', encoding='utf-8') as file, open(output_file, output_mode(fingerprints), newline='', encoding='utf-8') as f:
         reader = csv.DictReader(file, delimiter=',')
         for row in reader:
             oci = row['oci']
@@ -100,6 +171,9 @@ def populate_data(csv_file, output_file, base_url, include_data=True, include_pr
             citing_date = row['citing_date'] 
             time_span = row['time_span']
 
+            if fingerprints is not None and not fingerprints.is_changed(oci, citing_url, cited_url, citing_date, time_span):
+                continue
+
             citation = PeerReview(oci,
                                   citing_url=citing_url,
                                   cited_url=cited_url,
@@ -107,11 +181,9 @@ def populate_data(csv_file, output_file, base_url, include_data=True, include_pr
                                   citing_date=citing_date)
 
             g = citation.get_peer_review_rdf(base_url, include_data=include_data, include_prov=include_prov)
+            f.write(g.serialize(format='turtle'))
 
-            with open(output_file, 'a', newline='', encoding='utf-8') as f:
-                f.write(g.serialize(format='turtle'))
-
-def populate_prov(csv_file, output_file, base_url, include_data=False, include_prov=True):
+def populate_prov(csv_file, output_file, base_url, include_data=False, include_prov=True, fingerprints=None):
     block_txt = ''
     with open(csv_file, mode='r', encoding='utf-8') as file:
         reader = csv.DictReader(file, delimiter=',')
@@ -121,6 +193,9 @@ def populate_prov(csv_file, output_file, base_url, include_data=False, include_p
             prov_source = row['source']
             prov_date = row['prov_date']
 
+            if fingerprints is not None and not fingerprints.is_changed(oci, agent_url, prov_source, prov_date):
+                continue
+
             citation = PeerReview(oci,
                                   prov_agent_url=agent_url,
                                   source=prov_source,
@@ -129,6 +204,6 @@ def populate_prov(csv_file, output_file, base_url, include_data=False, include_p
             g = citation.get_peer_review_rdf(base_url, include_data=include_data, include_prov=include_prov)
             block_txt += g.serialize(format='turtle')
 
-    if block_txt:
-        with open(output_file, 'a', newline='',  encoding='utf-8') as f:
+    if block_txt or fingerprints is not None:
+        with open(output_file, output_mode(fingerprints), newline='',  encoding='utf-8') as f:
             f.write(block_txt)
@@ -1,26 +1,37 @@
 import polars as pl
 import argparse
 import os
+from processing.CitationDataset import PARTITION_COLUMNS, add_partition_columns, dataset_path, is_dataset, scan_citations, write_dataset
 
 class Compartimentizer:
-    def __init__(self, columns_to_drop, columns_to_drop1, columns_to_drop2, output_path, output_path1, output_path2):
+    def __init__(self, columns_to_drop, columns_to_drop1, columns_to_drop2, output_path, output_path1, output_path2, output_format='csv', row_group_size=None):
         self.columns_to_drop = columns_to_drop
         self.columns_to_drop1 = columns_to_drop1
         self.columns_to_drop2 = columns_to_drop2
         self.output_path = output_path
         self.output_path1 = output_path1
         self.output_path2 = output_path2
+        self.output_format = output_format
+        self.row_group_size = row_group_size
 
     def compartimentizer(self, path):
-        df = pl.read_csv(path)
+        if is_dataset(path):
+            df = scan_citations(path).collect()
+        else:
+            df = pl.read_csv(path)
+        if self.output_format != 'csv' and not all(column in df.columns for column in PARTITION_COLUMNS):
+            # le colonne di partizione si calcolano prima del drop, così valgono per tutte e tre le tabelle
+            df = add_partition_columns(df)
         df1 = df.clone()
         df2 = df.clone()
-        df = df.drop(self.columns_to_drop)
-        df1 = df1.drop(self.columns_to_drop1)
-        df2 = df2.drop(self.columns_to_drop2)
-        df.write_csv(self.output_path)
-        df1.write_csv(self.output_path1)
-        df2.write_csv(self.output_path2)
+        df = df.drop(self.columns_to_drop, strict=False)
+        df1 = df1.drop(self.columns_to_drop1, strict=False)
+        df2 = df2.drop(self.columns_to_drop2, strict=False)
+        for frame, output_path in ((df, self.output_path), (df1, self.output_path1), (df2, self.output_path2)):
+            if self.output_format in ('csv', 'both'):
+                frame.drop(PARTITION_COLUMNS, strict=False).write_csv(output_path)
+            if self.output_format in ('parquet', 'both'):
+                write_dataset(frame, dataset_path(output_path), self.row_group_size)
         print(f"Files saved to: {self.output_path}, {self.output_path1}, {self.output_path2}")
 
 # def main():
@@ -5,6 +5,8 @@ from datetime import datetime
 import pytz
 from dateutil.parser import parse
 from dateutil.relativedelta import relativedelta
+from processing.CitationDataset import write_dataset
+from extraction.DoiKeys import normalize_doi_expr
 
 class Filter:
     def __init__(self, peer_review_dir, non_peer_review_dir, output_path, column_to_join="cited_doi"):
@@ -19,16 +21,25 @@ class Filter:
         for file in sorted(os.listdir(directory)):
             if file.endswith('.csv'):
                 try:
-                    df = pl.scan_csv(os.path.join(directory, file))
-                    df_normalized = df.with_columns(cited_doi=pl.col("cited_doi").str.strip_chars("\n.").str.to_lowercase())
-                    dataframes.append(df_normalized)
+                    dataframes.append(pl.scan_csv(os.path.join(directory, file)))
                 except Exception as e:
                     print(f"Error reading file {file}: {e}")
         
         if not dataframes:
             raise ValueError(f"No valid CSV files found in directory: {directory}")
+
+        if all("cited_key" in df.collect_schema().names() for df in dataframes):
+            # DOI già normalizzati in estrazione, con le chiavi intere
+            dataframes = [df.with_columns(pl.col("^.*_key$").cast(pl.Int64)) for df in dataframes]
+        else:
+            # CSV estratti prima delle chiavi: join sulle stringhe, normalizzate come in NonPeerDedup
+            dataframes = [
+                df.drop("citing_key", "cited_key", strict=False).with_columns(normalize_doi_expr())
+                for df in dataframes
+            ]
         
-        concatenated_df = pl.concat(dataframes)
+        # diagonal: i CSV non-peer più vecchi non hanno la colonna cited_indexed
+        concatenated_df = pl.concat(dataframes, how="diagonal_relaxed")
         return concatenated_df
 
 
@@ -43,6 +54,17 @@ class Filter:
 
 
     def join_dataframes(self, df1, df2):
+        # cited_indexed serve solo alla deduplicazione, non entra nell'output
+        df2 = df2.drop("cited_indexed", strict=False)
+        if self.column_to_join == "cited_doi" and "cited_key" in df1.collect_schema().names() and "cited_key" in df2.collect_schema().names():
+            # join sulle chiavi a 64 bit; il confronto dei DOI sulle sole righe accoppiate scarta eventuali collisioni
+            joined_df = (
+                df1.join(df2.drop("citing_key", strict=False), on="cited_key", how="inner")
+                .filter(pl.col("cited_doi") == pl.col("cited_doi_right"))
+                .drop("cited_doi_right")
+            )
+            return joined_df
+        df2 = df2.drop("citing_key", "cited_key", strict=False)
         joined_df = df1.join(df2, on=self.column_to_join, how="inner")
         return joined_df 
 
@@ -91,7 +113,10 @@ class Delta:
 
     def calculate_date_difference(self, citing_date, cited_date):
         default_date = datetime(1900, 1, 1)
-        
+        # una data mancante (created assente in Crossref) arriva come null o stringa vuota
+        citing_date = citing_date or ""
+        cited_date = cited_date or ""
+
         if self.contains_years(cited_date) and self.contains_years(citing_date):
             citing_pub_datetime = parse(citing_date[:10], default=default_date)
             cited_pub_datetime = parse(cited_date[:10], default=default_date)
@@ -106,7 +131,7 @@ class Delta:
 
     def add_delta_column(self):
         self.df = self.df.with_columns(
-            pl.struct(["citing_date", "cited_date"]).map_elements(
+            pl.struct(pl.col("citing_date").fill_null(""), pl.col("cited_date").fill_null("")).map_elements(
                 lambda x: self.calculate_date_difference(x["citing_date"], x["cited_date"]),
                 return_dtype=pl.Utf8
             ).alias("time_span")
@@ -115,4 +140,7 @@ class Delta:
 
     def save_csv(self, output_csv):
         self.df.sink_csv(output_csv)
-        print(f"CSV with Delta column saved as {output_csv}")
\ No newline at end of file
+        print(f"CSV with Delta column saved as {output_csv}")
+
+    def save_parquet(self, output_dir, row_group_size=None):
+        write_dataset(self.df, output_dir, row_group_size)
\ No newline at end of file
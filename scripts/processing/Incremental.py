@@ -0,0 +1,140 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import polars as pl
+
+from extraction.PeerExtractor import PeerExtractor, CSVWriterPeer
+from extraction.NonPeerExtractor import NonPeerExtractor, CSVWriterNonPeer
+from processing.FilterJoinDeltaDir import Filter, Delta
+from processing.NonPeerDedup import latest_records
+
+class IncrementalUpdater:
+    # Aggiorna un output PROCI esistente a partire da un delta Crossref: estrae solo i file
+    # nuovi o modificati (rispetto al manifest) e gli item indicizzati dopo l'ultimo
+    # aggiornamento, li unisce con gli store peer/non-peer esistenti e sostituisce o
+    # aggiunge le OCI risultanti nell'indice.
+    def __init__(self, peer_dir, non_peer_dir, index_path, manifest_path, batch_size=10, max_workers=2, decoder='auto'):
+        self.peer_dir = peer_dir
+        self.non_peer_dir = non_peer_dir
+        self.index_path = index_path
+        self.manifest_path = manifest_path
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.decoder = decoder
+
+    def load_manifest(self):
+        if not os.path.isfile(self.manifest_path):
+            return {"members": {}, "indexed_until": None}
+        with open(self.manifest_path, 'r', encoding='utf-8') as manifest_file:
+            return json.load(manifest_file)
+
+    def save_manifest(self, manifest):
+        manifest_dir = os.path.dirname(self.manifest_path)
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as manifest_file:
+            json.dump(manifest, manifest_file, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    def update(self, delta_path, delta_name, since=None):
+        manifest = self.load_manifest()
+        since = since or manifest.get("indexed_until")
+        known_members = manifest["members"]
+        seen_members = {}
+
+        def is_changed(source, member):
+            fingerprint = source.fingerprint(member)
+            seen_members[member.name] = fingerprint
+            return known_members.get(member.name) != fingerprint
+
+        index_dir = os.path.dirname(os.path.abspath(self.index_path))
+        os.makedirs(index_dir, exist_ok=True)
+        staging_dir = tempfile.mkdtemp(prefix="prociinc_", dir=index_dir)
+        try:
+            staging_peer_dir = os.path.join(staging_dir, "peer")
+            staging_non_peer_dir = os.path.join(staging_dir, "non_peer")
+            staging_peer_file = os.path.join(staging_peer_dir, "peer_results.csv")
+            staging_non_peer_file = os.path.join(staging_non_peer_dir, "non_peer_results.csv")
+
+            print(f"Extracting items indexed after {since}" if since else "Extracting all items of the changed files")
+            peer_extractor = PeerExtractor(delta_path, self.batch_size, self.max_workers, decoder=self.decoder, since=since)
+            peer_extractor.process_files(CSVWriterPeer(staging_peer_file), member_filter=is_changed)
+            changed = [name for name, fingerprint in seen_members.items() if known_members.get(name) != fingerprint]
+            print(f"{len(changed)} new or changed files out of {len(seen_members)}")
+            if not changed:
+                print("Nothing to update")
+                return
+
+            changed_names = set(changed)
+            non_peer_extractor = NonPeerExtractor(delta_path, self.batch_size, self.max_workers, decoder=self.decoder, since=since)
+            non_peer_extractor.process_files(CSVWriterNonPeer(staging_non_peer_file), member_filter=lambda source, member: member.name in changed_names)
+
+            delta_rows = self.join_delta(staging_peer_dir, staging_non_peer_dir)
+            self.merge_into_index(delta_rows)
+
+            # i CSV del delta entrano negli store, così anche un run completo li vede; il nome
+            # dipende solo dai file cambiati e da since, quindi se il run si interrompe prima del
+            # manifest, il run successivo sullo stesso delta sovrascrive gli stessi file
+            run_name = f"{delta_name}_incremental_{self.run_id(since, {name: seen_members[name] for name in changed})}"
+            for staging_file, store_dir in ((staging_peer_file, self.peer_dir), (staging_non_peer_file, self.non_peer_dir)):
+                if os.path.isfile(staging_file):
+                    os.makedirs(store_dir, exist_ok=True)
+                    shutil.move(staging_file, os.path.join(store_dir, f"{run_name}_{os.path.basename(staging_file)}"))
+
+            known_members.update(seen_members)
+            indexed_values = [value for value in (since, peer_extractor.max_indexed, non_peer_extractor.max_indexed) if value]
+            manifest["indexed_until"] = max(indexed_values) if indexed_values else None
+            self.save_manifest(manifest)
+            print(f"Manifest saved to {self.manifest_path}")
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    @staticmethod
+    def run_id(since, changed_members):
+        data = json.dumps({"since": since, "members": changed_members}, sort_keys=True, default=str)
+        return hashlib.blake2b(data.encode('utf-8'), digest_size=8).hexdigest()
+
+    def join_delta(self, staging_peer_dir, staging_non_peer_dir):
+        data_filter = Filter(self.peer_dir, self.non_peer_dir, self.index_path)
+        peer_delta = data_filter.read_and_concatenate_dataframes(staging_peer_dir).unique(subset=["oci"], keep="any")
+        non_peer_delta = latest_records(data_filter.read_and_concatenate_dataframes(staging_non_peer_dir))
+        peer_old = data_filter.read_and_concatenate_dataframes(self.peer_dir)
+        non_peer_old = latest_records(data_filter.read_and_concatenate_dataframes(self.non_peer_dir))
+
+        # la versione del delta sostituisce quella già presente negli store
+        non_peer_all = pl.concat([
+            non_peer_old.join(non_peer_delta.select(data_filter.column_to_join), on=data_filter.column_to_join, how="anti"),
+            non_peer_delta
+        ], how="diagonal_relaxed")
+        peer_unchanged = peer_old.join(peer_delta.select("oci"), on="oci", how="anti")
+
+        joined_df = pl.concat([
+            data_filter.join_dataframes(peer_delta, non_peer_all),
+            data_filter.join_dataframes(peer_unchanged, non_peer_delta)
+        ], how="diagonal_relaxed").unique(subset=["oci"], keep="any")
+
+        delta_calculator = Delta(data_filter.add_provenance(joined_df))
+        delta_calculator.add_delta_column()
+        return delta_calculator.df
+
+    def merge_into_index(self, delta_rows):
+        delta_rows = delta_rows.collect()
+        if not os.path.isfile(self.index_path):
+            delta_rows.write_csv(self.index_path)
+            print(f"{delta_rows.height} citations saved to new index {self.index_path}")
+            return
+
+        index_df = pl.scan_csv(self.index_path, infer_schema=False)
+        columns = index_df.collect_schema().names()
+        delta_rows = delta_rows.with_columns(pl.all().cast(pl.Utf8))
+        merged_df = pl.concat([
+            index_df.join(delta_rows.lazy().select("oci"), on="oci", how="anti"),
+            delta_rows.lazy().select(columns)
+        ])
+        tmp_path = self.index_path + ".tmp"
+        merged_df.collect().write_csv(tmp_path)
+        os.replace(tmp_path, self.index_path)
+        print(f"{delta_rows.height} new or updated citations merged into {self.index_path}")
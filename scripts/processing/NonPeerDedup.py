@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import polars as pl
+from extraction.DoiKeys import normalize_doi_expr, with_doi_keys
+
+# a parità di cited_indexed vince il created più recente, poi la riga letta per ultima
+VERSION_COLUMNS = ["cited_indexed", "cited_date", "_order"]
+
+def latest_records(df, key="cited_doi"):
+    # una riga per DOI: la versione indicizzata più di recente (i CSV precedenti senza
+    # cited_indexed ricadono su cited_date)
+    columns = df.collect_schema().names()
+    order = [column for column in VERSION_COLUMNS if column in columns]
+    if order:
+        # ordinamento stabile: a parità di chiavi vince sempre la stessa riga
+        df = df.sort(order, descending=True, nulls_last=True, maintain_order=True)
+    return df.unique(subset=[key], keep="first", maintain_order=True)
+
+class NonPeerDeduplicator:
+    # Deduplica gli item non-peer prima del join, in streaming e per partizioni:
+    # 1) i CSV vengono letti a batch e ogni riga va nel bucket cited_key % buckets;
+    # 2) ogni bucket (1/buckets dei dati) viene caricato da solo e ridotto a una riga per DOI.
+    def __init__(self, buckets=64, batch_size=500000):
+        self.buckets = buckets
+        self.batch_size = batch_size
+
+    def deduplicate(self, non_peer_dir, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        bucket_dir = tempfile.mkdtemp(prefix="dedup_buckets_", dir=output_dir)
+        try:
+            rows = self.split_into_buckets(non_peer_dir, bucket_dir)
+            kept = 0
+            for bucket_file in sorted(os.listdir(bucket_dir)):
+                bucket = pl.read_csv(os.path.join(bucket_dir, bucket_file), infer_schema_length=0)
+                bucket = latest_records(bucket.with_columns(pl.col("_order").cast(pl.Int64)))
+                bucket.drop("_order").write_csv(os.path.join(output_dir, bucket_file))
+                kept += bucket.height
+        finally:
+            shutil.rmtree(bucket_dir, ignore_errors=True)
+        print(f"{rows} non-peer records deduplicated to {kept} in {output_dir}")
+
+    def split_into_buckets(self, non_peer_dir, bucket_dir):
+        rows = 0
+        for file in sorted(os.listdir(non_peer_dir)):
+            if not file.endswith('.csv'):
+                continue
+            reader = pl.read_csv_batched(os.path.join(non_peer_dir, file), infer_schema_length=0, batch_size=self.batch_size)
+            while True:
+                batches = reader.next_batches(1)
+                if not batches:
+                    break
+                batch = batches[0]
+                first_row = rows
+                rows += batch.height
+                if "cited_indexed" not in batch.columns:
+                    batch = batch.with_columns(pl.lit(None, dtype=pl.Utf8).alias("cited_indexed"))
+                if "cited_key" not in batch.columns:
+                    batch = with_doi_keys(batch, ("cited_doi",))
+                batch = batch.select(
+                    normalize_doi_expr(),
+                    pl.exclude("cited_doi", "cited_indexed", "cited_key"),
+                    pl.col("cited_indexed"),
+                    pl.col("cited_key").cast(pl.Int64),
+                    pl.int_range(first_row, first_row + pl.len(), dtype=pl.Int64).alias("_order"),
+                ).filter(pl.col("cited_doi").is_not_null() & (pl.col("cited_doi") != ""))
+                for (bucket_id,), part in batch.with_columns((pl.col("cited_key") % self.buckets).abs().alias("_bucket")).partition_by("_bucket", as_dict=True).items():
+                    self.append(os.path.join(bucket_dir, f"non_peer_dedup_{bucket_id:04d}.csv"), part.drop("_bucket"))
+        return rows
+
+    @staticmethod
+    def append(path, part):
+        new_file = not os.path.exists(path)
+        with open(path, 'ab') as bucket_file:
+            part.write_csv(bucket_file, include_header=new_file)
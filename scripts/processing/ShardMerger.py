@@ -0,0 +1,43 @@
+import os
+import re
+import polars as pl
+from processing.NonPeerDedup import latest_records
+from extraction.DoiKeys import normalize_doi_expr
+
+SHARD_PATTERN = re.compile(r"_shard(\d+)of(\d+)")
+
+class ShardMerger:
+    def __init__(self, key_column, normalize_key=False):
+        self.key_column = key_column
+        self.normalize_key = normalize_key
+
+    def check_parts(self, input_paths):
+        found = {}
+        for path in input_paths:
+            match = SHARD_PATTERN.search(os.path.basename(path))
+            if match:
+                found.setdefault(int(match.group(2)), set()).add(int(match.group(1)))
+        for count, indexes in found.items():
+            missing = sorted(set(range(count)) - indexes)
+            if missing:
+                raise ValueError(f"Missing shard parts of {count}: {missing}")
+
+    def merge(self, input_paths, output_path):
+        self.check_parts(input_paths)
+        parts = [pl.scan_csv(path, infer_schema=False) for path in sorted(input_paths)]
+        if not parts:
+            raise ValueError("No shard parts to merge")
+
+        df = pl.concat(parts, how="diagonal")
+        output_dir = os.path.dirname(output_path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        if self.normalize_key:
+            # record non-peer: si tiene la versione più recente, come in FilterJoinDeltaDir e Incremental
+            df = df.with_columns(normalize_doi_expr(self.key_column)).with_row_index("_order")
+            latest_records(df, self.key_column).drop("_order").collect().write_csv(output_path)
+        else:
+            # la prima occorrenza nell'ordine dei file, così il risultato non cambia tra un run e l'altro
+            df.unique(subset=[self.key_column], keep="first", maintain_order=True).collect().write_csv(output_path)
+        print(f"Merged {len(parts)} shard parts into {output_path}")
@@ -5,6 +5,8 @@ import gzip
 import json
 import csv
 import os
+import shutil
+import tempfile
 import errno
 import argparse
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -18,11 +20,21 @@ from dateutil.relativedelta import relativedelta
 
 from extraction.PeerExtractor import PeerExtractor, OciProcess, CSVWriterPeer
 from extraction.NonPeerExtractor import NonPeerExtractor, CSVWriterNonPeer
+from extraction.Decoders import DECODERS
+from extraction.Sharding import parse_shard, shard_suffix, SHARD_STRATEGIES
 from processing.FilterJoinDeltaDir import Filter, Delta
 from processing.Compartimentizer import Compartimentizer
-from post_processing.RDFcreator import PeerReview, populate_data, populate_prov
+from processing.CitationDataset import OUTPUT_FORMATS, dataset_path
+from processing.NonPeerDedup import NonPeerDeduplicator
+from processing.ShardMerger import ShardMerger
+from processing.Incremental import IncrementalUpdater
+from post_processing.RDFcreator import PeerReview, FingerprintStore, populate_data, populate_prov
 from analysis.VenueCounter import VenueCounter
 from analysis.MetaAnalysis import MetaAnalysis
+from analysis.AggregateCubes import AggregateCubes
+from analysis.ReviewCounter import ReviewCounter
+from lookup.CitationIndex import CitationIndexBuilder, CitationIndex
+from lookup.LookupServer import LookupServer
 
 
 def parse_args():
@@ -30,32 +42,72 @@ def parse_args():
     subparsers = parser.add_subparsers(dest='command', required=True)
 
     # PeerExtractor -- parameters
-    peer_parser = subparsers.add_parser('PeerExtractor', help='Process JSON.gz files in a ZIP and output to CSV.')
-    peer_parser.add_argument("peer_zip_filename", help="The input ZIP file containing JSON.gz files.")
+    peer_parser = subparsers.add_parser('PeerExtractor', help='Process JSON.gz files in a ZIP, a tar or a directory and output to CSV.')
+    peer_parser.add_argument("peer_zip_filename", help="The input ZIP file, tar file or directory containing JSON.gz files.")
     peer_parser.add_argument("--peer_output_file", help="Path to save the output CSV file", default="../data/processed/peer/peer_results.csv")
-    peer_parser.add_argument("--peer_batch_size", type=int, default=10, help="Number of files to process in each batch.")
+    peer_parser.add_argument("--peer_batch_size", type=int, default=10, help="Number of files whose items are written to the CSV together.")
     peer_parser.add_argument("--peer_max_files", type=int, help="Maximum number of files to process.")
-    peer_parser.add_argument("--peer_max_workers", type=int, default=2, help="Number of maximum worker threads.")
+    peer_parser.add_argument("--peer_max_workers", type=int, default=2, help="Number of decoding worker threads.")
+    peer_parser.add_argument("--peer_read_ahead", type=int, help="Number of files read ahead of the decoding workers.")
+    peer_parser.add_argument("--peer_mmap", action='store_true', help="Read the JSON.gz files of a directory input through mmap.")
+    peer_parser.add_argument("--peer_shard", type=parse_shard, help="Process only shard i/N of the input files (0 <= i < N).")
+    peer_parser.add_argument("--peer_shard_strategy", choices=SHARD_STRATEGIES, default='hash', help="Assign files to shards by name hash or by balancing sizes.")
+    peer_parser.add_argument("--peer_decoder", choices=DECODERS, default='auto', help="JSON decoder backend (auto uses msgspec when installed).")
 
     # NonPeerExtractor -- parameters
-    non_peer_parser = subparsers.add_parser('NonPeerExtractor', help='Process JSON.gz files in a ZIP and output to CSV.')
-    non_peer_parser.add_argument("non_peer_zip_filename", help="The input ZIP file containing JSON.gz files.")
+    non_peer_parser = subparsers.add_parser('NonPeerExtractor', help='Process JSON.gz files in a ZIP, a tar or a directory and output to CSV.')
+    non_peer_parser.add_argument("non_peer_zip_filename", help="The input ZIP file, tar file or directory containing JSON.gz files.")
     non_peer_parser.add_argument("--non_peer_output_file", help="Path to save the output CSV file", default="../data/processed/non_peer/non_peer_results.csv")
-    non_peer_parser.add_argument("--non_peer_batch_size", type=int, default=10, help="Number of files to process in each batch.")
+    non_peer_parser.add_argument("--non_peer_batch_size", type=int, default=10, help="Number of files whose items are written to the CSV together.")
     non_peer_parser.add_argument("--non_peer_max_files", type=int, help="Maximum number of files to process.")
-    non_peer_parser.add_argument("--non_peer_max_workers", type=int, default=2, help="Number of maximum worker threads.")
+    non_peer_parser.add_argument("--non_peer_max_workers", type=int, default=2, help="Number of decoding worker threads.")
+    non_peer_parser.add_argument("--non_peer_read_ahead", type=int, help="Number of files read ahead of the decoding workers.")
+    non_peer_parser.add_argument("--non_peer_mmap", action='store_true', help="Read the JSON.gz files of a directory input through mmap.")
+    non_peer_parser.add_argument("--non_peer_shard", type=parse_shard, help="Process only shard i/N of the input files (0 <= i < N).")
+    non_peer_parser.add_argument("--non_peer_shard_strategy", choices=SHARD_STRATEGIES, default='hash', help="Assign files to shards by name hash or by balancing sizes.")
+    non_peer_parser.add_argument("--non_peer_decoder", choices=DECODERS, default='auto', help="JSON decoder backend (auto uses msgspec when installed).")
+
+    # MergeShards -- parameters
+    merge_parser = subparsers.add_parser("MergeShards", help="Merge and deduplicate the part files written by sharded extractions")
+    merge_parser.add_argument("merge_input_files", nargs='+', help="The shard part CSV files to merge.")
+    merge_parser.add_argument("--merge_kind", choices=['peer', 'non_peer'], required=True, help="Deduplicate peer parts by OCI or non-peer parts by DOI.")
+    merge_parser.add_argument("--merge_output_file", help="Path to save the merged CSV file", required=True)
 
-    
     # FilterJoinDelta -- parameters
     filter_parser = subparsers.add_parser("FilterJoinDeltaDir", help="Join peer review and non-peer review DataFrames and calculate delta")
     filter_parser.add_argument("--filter_peer_review_dir", help="The directory containing the peer review CSV files.", required=True)
     filter_parser.add_argument("--filter_non_peer_review_dir", help="The directory containing the non-peer review CSV files.", required=True)
     filter_parser.add_argument("--filter_output_path", help="Directory to save the output CSV file", default="../data/processed/filtered/results.csv")  
+    filter_parser.add_argument("--filter_output_format", choices=OUTPUT_FORMATS, default="csv", help="Write a flat CSV, a Parquet dataset partitioned by citing year and cited DOI prefix (next to the CSV path, without extension), or both")
+    filter_parser.add_argument("--filter_row_group_size", type=int, default=None, help="Rows per Parquet row group")
+    filter_parser.add_argument("--filter_skip_dedup", action='store_true', help="Join every non-peer record as extracted, without keeping only the latest version of each DOI")
+    filter_parser.add_argument("--filter_dedup_buckets", type=int, default=64, help="Number of hash partitions used to deduplicate the non-peer records")
+
+    # NonPeerDedup -- parameters
+    dedup_parser = subparsers.add_parser("DedupNonPeer", help="Keep only the latest version of each non-peer DOI")
+    dedup_parser.add_argument("dedup_non_peer_dir", help="The directory containing the non-peer review CSV files.")
+    dedup_parser.add_argument("--dedup_output_dir", help="Directory to save the deduplicated CSV files", default="../data/processed/non_peer_dedup")
+    dedup_parser.add_argument("--dedup_buckets", type=int, default=64, help="Number of hash partitions (each one is loaded in memory on its own)")
+    dedup_parser.add_argument("--dedup_batch_size", type=int, default=500000, help="Rows read at a time while partitioning")
     
+    # Incremental -- parameters
+    incremental_parser = subparsers.add_parser("Incremental", help="Update an existing PROCI output with a Crossref delta or a newer snapshot")
+    incremental_parser.add_argument("incremental_input", help="The delta: a ZIP file, tar file or directory containing JSON.gz files.")
+    incremental_parser.add_argument("--incremental_peer_dir", help="The directory containing the peer review CSV files.", default="../data/processed/peer")
+    incremental_parser.add_argument("--incremental_non_peer_dir", help="The directory containing the non-peer review CSV files.", default="../data/processed/non_peer")
+    incremental_parser.add_argument("--incremental_index", help="The joined CSV file produced by FilterJoinDeltaDir.", default="../data/processed/filtered/results.csv")
+    incremental_parser.add_argument("--incremental_manifest", help="Manifest of the files and indexed dates already processed (default: next to the index).")
+    incremental_parser.add_argument("--incremental_since", help="Only extract items indexed after this ISO date-time (default: taken from the manifest).")
+    incremental_parser.add_argument("--incremental_batch_size", type=int, default=10, help="Number of files whose items are written to the CSV together.")
+    incremental_parser.add_argument("--incremental_max_workers", type=int, default=2, help="Number of decoding worker threads.")
+    incremental_parser.add_argument("--incremental_decoder", choices=DECODERS, default='auto', help="JSON decoder backend (auto uses msgspec when installed).")
+
     # Compartimentizer -- parameters
     compart_parser = subparsers.add_parser("Compartimentizer", help="DataFrame Compartimentizer")
-    compart_parser.add_argument("compart_input_path", help="Path to the input CSV file")
+    compart_parser.add_argument("compart_input_path", help="Path to the input CSV file or Parquet dataset")
     compart_parser.add_argument("--output_dir", help="Directory to save the output CSV files", default="../data/processed/compartimentized")
+    compart_parser.add_argument("--compart_output_format", choices=OUTPUT_FORMATS, default="csv", help="Write CSV files, Parquet datasets partitioned by citing year and cited DOI prefix, or both")
+    compart_parser.add_argument("--compart_row_group_size", type=int, default=None, help="Rows per Parquet row group")
     
     # RDFcreator -- parameters
     rdf_parser = subparsers.add_parser("RDF", help="Process some integers.")
@@ -66,20 +118,54 @@ def parse_args():
     rdf_parser.add_argument('--rdf_prov', dest='rdf_include_prov', action='store_true', help='Include provenance')
     rdf_parser.add_argument('--rdf_populate_data', dest='rdf_populate_data', action='store_true', help='Populate data')
     rdf_parser.add_argument('--rdf_populate_prov', dest='rdf_populate_prov', action='store_true', help='Populate provenance')
+    rdf_parser.add_argument('--rdf_fingerprints', type=str, help='Fingerprint file of the previous release: only new or changed citations are written, and the file is updated')
+    rdf_parser.add_argument('--rdf_removed', type=str, help='Output file listing the citations removed since the previous release (default: next to the fingerprint file)')
+    rdf_parser.add_argument('--rdf_replaced', type=str, help='Output file listing the citations whose triples changed since the previous release and must be deleted before loading the new ones (default: next to the fingerprint file)')
     
     # VenueCounter -- parameters
     venue_parser = subparsers.add_parser("Venue", help="Path to the input CSV file")
-    venue_parser.add_argument('venue_csv_file', help='Path to the input CSV file')
+    venue_parser.add_argument('venue_csv_file', help='Path to the input CSV file or Parquet dataset')
+    venue_parser.add_argument('--venue_citing_years', nargs='+', help='Only count citations from these citing years')
     venue_parser.add_argument('--venue_top_n', type=int, default=10, help='Number of top venues to display')
     venue_parser.add_argument('--venue_output_file', help='Path to the output CSV file to save results', default="../data/processed/venue_counts/top_venues.csv")
 
+    # AggregateCubes -- parameters
+    cubes_parser = subparsers.add_parser("Cubes", help="Precompute time-span and coverage aggregate tables")
+    cubes_parser.add_argument('cubes_csv_file', help='Path to the joined CSV file produced by FilterJoinDeltaDir')
+    cubes_parser.add_argument('--cubes_output_dir', help='Directory to save the aggregate CSV files', default="../data/processed/analysis/cubes")
+
+    # ReviewCounter -- parameters
+    topk_parser = subparsers.add_parser("TopReviews", help="Streaming top-k of review counts per cited DOI, reviewer and venue")
+    topk_parser.add_argument('topk_input', help='Path to the joined CSV file or Parquet dataset')
+    topk_parser.add_argument('--topk_k', type=int, default=10, help='Number of top entities to report')
+    topk_parser.add_argument('--topk_capacity', type=int, default=1000, help='Counters kept per dimension (bounds memory; larger is more accurate)')
+    topk_parser.add_argument('--topk_batch_size', type=int, default=100000, help='Rows per CSV batch')
+    topk_parser.add_argument('--topk_exact', action='store_true', help='Second pass to compute exact counts for the candidates')
+    topk_parser.add_argument('--topk_output_dir', help='Directory to save the top-k CSV files', default="../data/processed/analysis/top_reviews")
+
     # MetaAnalysis -- parameters
     meta_parser = subparsers.add_parser("Meta", help="Meta Analysis")
-    meta_parser.add_argument('meta_combined_csv', help='Path to the combined CSV file')
+    meta_parser.add_argument('meta_combined_csv', help='Path to the combined CSV file or Parquet dataset')
+    meta_parser.add_argument('--meta_citing_years', nargs='+', help='Only consider citations from these citing years')
     meta_parser.add_argument('meta_zip_file', help='Path to the OpenCitations Meta zip file')
     meta_parser.add_argument('--meta_mode', choices=['peer', 'article', 'all'], default='all', help='Mode of operation')
     meta_parser.add_argument('--meta_output_file', help='Path to the output CSV file to save counts', default="../data/processed/meta_comparison/meta_counts.csv")
 
+    # CitationIndex -- parameters
+    index_parser = subparsers.add_parser("LookupIndex", help="Build the memory-mapped lookup index of the citation CSV")
+    index_parser.add_argument('index_csv_file', help='Path to the citation CSV file (e.g. Citation.csv)')
+    index_parser.add_argument('--index_dir', help='Directory to save the index', default="../data/processed/lookup_index")
+
+    # Lookup -- parameters
+    lookup_parser = subparsers.add_parser("Lookup", help="Query the lookup index from the command line or serve it over HTTP")
+    lookup_parser.add_argument('lookup_index_dir', help='Directory containing the lookup index')
+    lookup_parser.add_argument('--lookup_reviews', nargs='+', default=[], help='Cited DOIs: return the peer reviews citing them')
+    lookup_parser.add_argument('--lookup_reviewed', nargs='+', default=[], help='Citing DOIs: return what these peer reviews review')
+    lookup_parser.add_argument('--lookup_oci', nargs='+', default=[], help='OCIs to look up')
+    lookup_parser.add_argument('--lookup_serve', action='store_true', help='Serve the index over HTTP')
+    lookup_parser.add_argument('--lookup_host', default="127.0.0.1", help='Host of the HTTP service')
+    lookup_parser.add_argument('--lookup_port', type=int, default=8080, help='Port of the HTTP service')
+
     args = parser.parse_args()
     return args
 
@@ -89,15 +175,18 @@ def main():
     print(f"Running command: {args.command}")
 
     if args.command == 'PeerExtractor':
-        input_basename = os.path.splitext(os.path.basename(args.peer_zip_filename))[0]
+        input_basename = os.path.splitext(os.path.basename(os.path.normpath(args.peer_zip_filename)))[0]
         
         peer_output_file = os.path.join(
             os.path.dirname(args.peer_output_file),
-            f"{input_basename}_peer_results.csv"
+            f"{input_basename}_peer_results{shard_suffix(args.peer_shard) if args.peer_shard else ''}.csv"
         )
 
         csv_writer = CSVWriterPeer(peer_output_file)
-        article_processor = PeerExtractor(args.peer_zip_filename, args.peer_batch_size)
+        article_processor = PeerExtractor(args.peer_zip_filename, args.peer_batch_size, args.peer_max_workers,
+                                          use_mmap=args.peer_mmap, read_ahead=args.peer_read_ahead,
+                                          shard=args.peer_shard, shard_strategy=args.peer_shard_strategy,
+                                          decoder=args.peer_decoder)
         article_processor.process_files(csv_writer, args.peer_max_files)
 
         unique_output_filename = peer_output_file.replace(".csv", "_unique.csv")
@@ -107,17 +196,28 @@ def main():
             print(f"Errore: Il file {peer_output_file} non esiste o non è un file.")
 
     if args.command == "NonPeerExtractor":
-        input_basename = os.path.splitext(os.path.basename(args.non_peer_zip_filename))[0]
+        input_basename = os.path.splitext(os.path.basename(os.path.normpath(args.non_peer_zip_filename)))[0]
     
         non_peer_output_file = os.path.join(
             os.path.dirname(args.non_peer_output_file),
-            f"{input_basename}_non_peer_results.csv"
+            f"{input_basename}_non_peer_results{shard_suffix(args.non_peer_shard) if args.non_peer_shard else ''}.csv"
         )
 
         csv_writer = CSVWriterNonPeer(non_peer_output_file)
-        article_processor = NonPeerExtractor(args.non_peer_zip_filename, args.non_peer_batch_size)
+        article_processor = NonPeerExtractor(args.non_peer_zip_filename, args.non_peer_batch_size, args.non_peer_max_workers,
+                                             use_mmap=args.non_peer_mmap, read_ahead=args.non_peer_read_ahead,
+                                             shard=args.non_peer_shard, shard_strategy=args.non_peer_shard_strategy,
+                                             decoder=args.non_peer_decoder)
         article_processor.process_files(csv_writer, args.non_peer_max_files)
 
+    # MergeShards
+    if args.command == "MergeShards":
+        if args.merge_kind == 'peer':
+            merger = ShardMerger("oci")
+        else:
+            merger = ShardMerger("cited_doi", normalize_key=True)
+        merger.merge(args.merge_input_files, args.merge_output_file)
+
     # FilterJoinDelta
     if args.command == "FilterJoinDeltaDir":
         data_filter = Filter(args.filter_peer_review_dir, args.filter_non_peer_review_dir, args.filter_output_path)
@@ -125,20 +225,53 @@ def main():
         print(os.listdir(args.filter_peer_review_dir))
         print(os.listdir(args.filter_non_peer_review_dir))
         data_filter = Filter(args.filter_peer_review_dir, args.filter_non_peer_review_dir, args.filter_output_path)
-        concatenated_peer_df = data_filter.read_and_concatenate_dataframes(args.filter_peer_review_dir)
-        concatenated_non_peer_df = data_filter.read_and_concatenate_dataframes(args.filter_non_peer_review_dir)
-        data_filter.validate_dataframes(concatenated_peer_df, concatenated_non_peer_df)
-        joined_df = data_filter.join_dataframes(concatenated_peer_df, concatenated_non_peer_df)
-        joined_df_with_provenance = data_filter.add_provenance(joined_df)
-        delta_calculator = Delta(joined_df_with_provenance)
-        delta_calculator.add_delta_column()
-        delta_calculator.save_csv(args.filter_output_path)
+        non_peer_dir = args.filter_non_peer_review_dir
+        dedup_dir = None
+        if not args.filter_skip_dedup:
+            # i record non-peer ripetuti tra file e snapshot moltiplicherebbero le righe del join
+            output_dir = os.path.dirname(os.path.abspath(args.filter_output_path))
+            os.makedirs(output_dir, exist_ok=True)
+            dedup_dir = tempfile.mkdtemp(prefix="non_peer_dedup_", dir=output_dir)
+            NonPeerDeduplicator(args.filter_dedup_buckets).deduplicate(args.filter_non_peer_review_dir, dedup_dir)
+            non_peer_dir = dedup_dir
+        try:
+            concatenated_peer_df = data_filter.read_and_concatenate_dataframes(args.filter_peer_review_dir)
+            concatenated_non_peer_df = data_filter.read_and_concatenate_dataframes(non_peer_dir)
+            data_filter.validate_dataframes(concatenated_peer_df, concatenated_non_peer_df)
+            joined_df = data_filter.join_dataframes(concatenated_peer_df, concatenated_non_peer_df)
+            joined_df_with_provenance = data_filter.add_provenance(joined_df)
+            delta_calculator = Delta(joined_df_with_provenance)
+            delta_calculator.add_delta_column()
+            if args.filter_output_format == 'both':
+                # il join e il calcolo del delta vengono eseguiti una sola volta
+                delta_calculator.df = delta_calculator.df.collect().lazy()
+            if args.filter_output_format in ('csv', 'both'):
+                delta_calculator.save_csv(args.filter_output_path)
+            if args.filter_output_format in ('parquet', 'both'):
+                delta_calculator.save_parquet(dataset_path(args.filter_output_path), args.filter_row_group_size)
+        finally:
+            if dedup_dir:
+                shutil.rmtree(dedup_dir, ignore_errors=True)
+
+    # NonPeerDedup
+    if args.command == "DedupNonPeer":
+        deduplicator = NonPeerDeduplicator(args.dedup_buckets, args.dedup_batch_size)
+        deduplicator.deduplicate(args.dedup_non_peer_dir, args.dedup_output_dir)
+
+    # Incremental
+    if args.command == "Incremental":
+        delta_name = os.path.splitext(os.path.basename(os.path.normpath(args.incremental_input)))[0]
+        manifest_path = args.incremental_manifest or os.path.join(os.path.dirname(args.incremental_index), "manifest.json")
+        updater = IncrementalUpdater(args.incremental_peer_dir, args.incremental_non_peer_dir, args.incremental_index, manifest_path,
+                                     batch_size=args.incremental_batch_size, max_workers=args.incremental_max_workers,
+                                     decoder=args.incremental_decoder)
+        updater.update(args.incremental_input, delta_name, since=args.incremental_since)
 
     # Compartimentizer
     if args.command == "Compartimentizer":
-        columns_to_drop = ["cited_issn", "cited_venue", "prov_agent", "source", "prov_date"]
-        columns_to_drop1 = ["citing_doi", "cited_doi", "citing_date", "cited_date", "citing_url", "cited_url", "cited_issn", "cited_venue", "cited_date", "time_span"]
-        columns_to_drop2 = ["oci", "citing_doi", "citing_date", "cited_date", "citing_url", "cited_url", "cited_date", "time_span", "prov_agent", "source", "prov_date", "time_span"]
+        columns_to_drop = ["cited_issn", "cited_venue", "prov_agent", "source", "prov_date", "citing_key", "cited_key"]
+        columns_to_drop1 = ["citing_doi", "cited_doi", "citing_date", "cited_date", "citing_url", "cited_url", "cited_issn", "cited_venue", "cited_date", "time_span", "citing_key", "cited_key"]
+        columns_to_drop2 = ["oci", "citing_doi", "citing_date", "cited_date", "citing_url", "cited_url", "cited_date", "time_span", "prov_agent", "source", "prov_date", "time_span", "citing_key", "cited_key"]
 
         if not os.path.exists(args.output_dir):
             os.makedirs(args.output_dir)
@@ -153,7 +286,9 @@ def main():
             columns_to_drop2=columns_to_drop2,
             output_path=output_path,
             output_path1=output_path1,
-            output_path2=output_path2
+            output_path2=output_path2,
+            output_format=args.compart_output_format,
+            row_group_size=args.compart_row_group_size
         )
 
         print(f"Saving CSVs as {output_path}, {output_path1}, and {output_path2}")
@@ -172,13 +307,28 @@ def main():
             default_output_dir, f"{input_basename}_rdf_output.ttl"
         )
         
+        fingerprints = FingerprintStore(args.rdf_fingerprints) if args.rdf_fingerprints else None
+
         # Esecuzione del processo RDF
         if args.rdf_populate_data:
-            populate_data(args.rdf_input, rdf_output_file, args.rdf_baseurl, include_data=args.rdf_include_data, include_prov=False)
+            populate_data(args.rdf_input, rdf_output_file, args.rdf_baseurl, include_data=args.rdf_include_data, include_prov=False, fingerprints=fingerprints)
         elif args.rdf_populate_prov:
-            populate_prov(args.rdf_input, rdf_output_file, args.rdf_baseurl, include_data=args.rdf_include_data, include_prov=args.rdf_include_prov)
+            populate_prov(args.rdf_input, rdf_output_file, args.rdf_baseurl, include_data=args.rdf_include_data, include_prov=args.rdf_include_prov, fingerprints=fingerprints)
         else:
             print("No action specified. Use --rdf_populate_data or --rdf_populate_prov.")
+            fingerprints = None
+
+        # Rilascio incrementale: aggiornamento dei fingerprint e liste delle citazioni rimosse e modificate
+        if fingerprints is not None:
+            rdf_removed_file = args.rdf_removed or os.path.splitext(args.rdf_fingerprints)[0] + "_removed.txt"
+            removed_count = fingerprints.write_removed(rdf_removed_file, args.rdf_baseurl)
+            print(f"{removed_count} removed citations listed in {rdf_removed_file}")
+            rdf_replaced_file = args.rdf_replaced or os.path.splitext(args.rdf_fingerprints)[0] + "_replaced.txt"
+            replaced_count = fingerprints.write_replaced(rdf_replaced_file, args.rdf_baseurl)
+            print(f"{replaced_count} changed citations listed in {rdf_replaced_file}")
+            # per ultimo: se una lista non viene scritta il rilascio si può rifare dai fingerprint precedenti
+            fingerprints.save()
+            print(f"Fingerprints saved in {args.rdf_fingerprints}")
 
         print(f"RDF file saved in {rdf_output_file}")
 
@@ -195,7 +345,7 @@ def main():
         )
         
         # Esecuzione dell'analisi
-        counter = VenueCounter(args.venue_csv_file)
+        counter = VenueCounter(args.venue_csv_file, args.venue_citing_years)
         top_venues = counter.get_top_venues(args.venue_top_n)
         print(f"Top {args.venue_top_n} venues:")
         print(top_venues)
@@ -204,6 +354,16 @@ def main():
         counter.save_to_csv(venue_output_file)
         print(f"Results saved in {venue_output_file}")
 
+    # AggregateCubes
+    if args.command == "Cubes":
+        cubes = AggregateCubes(args.cubes_csv_file)
+        cubes.save(args.cubes_output_dir)
+
+    # ReviewCounter
+    if args.command == "TopReviews":
+        counter = ReviewCounter(args.topk_input, k=args.topk_k, capacity=args.topk_capacity, batch_size=args.topk_batch_size)
+        counter.save(args.topk_output_dir, exact=args.topk_exact)
+
     # MetaAnalysis
     if args.command == "Meta":
         # Creazione directory di output
@@ -217,7 +377,7 @@ def main():
         )
         
         # Esecuzione dell'analisi
-        analysis = MetaAnalysis(args.meta_combined_csv)
+        analysis = MetaAnalysis(args.meta_combined_csv, args.meta_citing_years)
 
         peer_count = article_count = None
         if args.meta_mode == 'peer' or args.meta_mode == 'all':
@@ -231,6 +391,26 @@ def main():
         analysis.save_counts_to_csv(meta_output_file, peer_count, article_count)
         print(f"Results saved in {meta_output_file}")
 
+    # CitationIndex
+    if args.command == "LookupIndex":
+        builder = CitationIndexBuilder(args.index_dir)
+        builder.build(args.index_csv_file)
+
+    # Lookup
+    if args.command == "Lookup":
+        with CitationIndex(args.lookup_index_dir) as index:
+            if args.lookup_serve:
+                LookupServer(index, args.lookup_host, args.lookup_port).run()
+            else:
+                results = {}
+                if args.lookup_reviews:
+                    results["reviews"] = index.reviews_of(args.lookup_reviews)
+                if args.lookup_reviewed:
+                    results["reviewed"] = index.reviewed_by(args.lookup_reviewed)
+                if args.lookup_oci:
+                    results["oci"] = index.lookup("oci", args.lookup_oci)
+                print(json.dumps(results, indent=2))
+
 
 if __name__ == '__main__':
     main()
\ No newline at end of file